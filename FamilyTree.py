@@ -1,5 +1,20 @@
 import json
+import re
 from collections import deque
+from family_tree_neighbourhood import SharedNeighbours, select_local_ids_batch, select_local_neighbourhood
+from family_tree_search import NameIndex
+from family_tree_validation import FamilyTreeValidationError, validate_family_tree
+
+# The first free-standing 3 or 4 digit number, so "1890", "1890-03-12",
+# "12 MAR 1890" and "ABT 1890" all give 1890.
+_YEAR = re.compile(r"(?<!\d)(\d{3,4})(?!\d)")
+
+def parse_year(date):
+	"""Year of a free-form BirthDate or DeathDate, or None when there is none."""
+	if not date:
+		return None
+	match = _YEAR.search(str(date))
+	return int(match.group(1)) if match else None
 
 class Person():
 
@@ -25,6 +40,17 @@ class Person():
 		
 		self.ID = id
 		
+	@staticmethod
+	def FromRecord(record):
+		person = Person(record["FirstName"], record["Gender"], record["ID"])
+		person.LastName = record.get("LastName", "")
+		person.MiddleNames = list(record.get("MiddleNames", []))
+		person.MaidenName = record.get("MaidenName", "")
+		person.Suffix = record.get("Suffix", "")
+		person.BirthDate = record.get("BirthDate")
+		person.DeathDate = record.get("DeathDate")
+		return person
+		
 	def GetNodeId(self):
 		return str(self.ID)
 		
@@ -46,6 +72,13 @@ class Person():
 		'''
 		return self.FirstName
 		
+	def GetFullName(self):
+		parts = [self.FirstName] + list(self.MiddleNames) + [self.LastName, self.Suffix]
+		name = " ".join(part for part in parts if part)
+		if self.MaidenName:
+			name += f' (née {self.MaidenName})'
+		return name
+		
 	def __str__(self):
 		return self.GetNodeLabel()
 		
@@ -58,6 +91,9 @@ class Marriage():
 		self.Status = None
 		self.Date = None
 		self.Children = children
+		# (person, relationship) for adopted, foster and other non-birth children; they
+		# are kept apart from Children so they get no Parents links.
+		self.OtherChildren = []
 		self.id = "m" + str(Marriage.next_id)
 		Marriage.next_id += 1
 
@@ -82,20 +118,74 @@ class Marriage():
 	def GetSpouse(self, person):
 		return self.Person1 if person == self.Person2 else self.Person2
 
+def is_local_marriage(spouse1_id, spouse2_id, child_ids, local_ids):
+	"""A marriage is drawn when both spouses are local, or one spouse and a child are."""
+	spouse1_in = spouse1_id in local_ids
+	spouse2_in = spouse2_id in local_ids
+	if spouse1_in and spouse2_in:
+		return True
+	return (spouse1_in or spouse2_in) and any(c in local_ids for c in child_ids)
+
+def select_local_marriages(local_people):
+	"""The marriages drawn with local_people, in marriage id order; shared by every backend."""
+	# Only marriages that a local person takes part in can qualify, so there is
+	# no need to scan every marriage in the tree.
+	local_ids = {p.GetId() for p in local_people}
+	seen = set()
+	local_marriages = []
+	for person in local_people:
+		for marriage in person.Marriages:
+			if marriage.GetId() in seen:
+				continue
+			seen.add(marriage.GetId())
+			if is_local_marriage(marriage.Person1.GetId(), marriage.Person2.GetId(), (c.GetId() for c in marriage.Children), local_ids):
+				local_marriages.append(marriage)
+	local_marriages.sort(key=lambda m: int(m.GetId()[1:]))
+	return local_marriages
+
 class FamilyTree():
 
-	def __init__(self, people_file, marraiges_file):
+	def __init__(self, people_file, marraiges_file, validate=True):
 		self.people = self._GetPeople(people_file)
+		self._people_by_id = self._IndexPeople(self.people)
 		self.marriages = self._GetMarriages(marraiges_file)
+		self._Finish(validate)
+		
+	@classmethod
+	def FromPeopleAndMarriages(cls, people, marriages, validate=True):
+		# For importers that build linked Person/Marriage objects themselves.
+		tree = cls.__new__(cls)
+		tree.people = list(people)
+		tree._people_by_id = tree._IndexPeople(tree.people)
+		tree.marriages = list(marriages)
+		tree._Finish(validate)
+		return tree
+		
+	def _Finish(self, validate):
+		# Validate before assigning generations so bad data fails fast with a report
+		# instead of producing contradictory generations.
+		self.validation_report = None
+		if validate:
+			self.validation_report = validate_family_tree(self.people, self.marriages)
+			if not self.validation_report.ok():
+				raise FamilyTreeValidationError(self.validation_report)
 		self.generations = self._DetermineGenerations()
+		self._name_index = None
 		
 	def _GetPeople(self, filename):
 		p = []
 		with open(filename, "r") as file:
 			obj = json.load(file)
 			for person in obj['People']:
-				p.append(Person(person["FirstName"], person["Gender"], person["ID"]))
+				p.append(Person.FromRecord(person))
 		return p
+		
+	def _IndexPeople(self, people):
+		index = {}
+		for person in people:
+			assert(person.GetId() not in index)
+			index[person.GetId()] = person
+		return index
 	
 	def _GetMarriages(self, filename):
 		m = []
@@ -110,10 +200,9 @@ class FamilyTree():
 			
 	def _DetermineGenerations(self):
 		# Set generations of all people
-		self._SetGeneration(self.people[0], 0)
-		while not self._DoAllPeopleHaveAGeneration():
-			peopleWithoutGen = [person for person in self.people if person.Generation is None]
-			self._SetGeneration(peopleWithoutGen[0], 0)
+		for person in self.people:
+			if person.Generation is None:
+				self._SetGeneration(person, 0)
 			
 		# Normalize gens to ascend from 0 and sort the people by generation
 		self._NormalizeGenerations()
@@ -141,103 +230,179 @@ class FamilyTree():
 			#print(f'{person.FirstName} - Generation {person.Generation}')
 		
 	def _SetGeneration(self, person, generation):
+		# Depth-first like the recursive version, but with an explicit stack so deep
+		# trees do not hit the recursion limit.
 		person.Generation = generation
+		stack = [self._GenerationLinks(person)]
+		while stack:
+			for relative, relative_generation in stack[-1]:
+				if relative.Generation is None:
+					relative.Generation = relative_generation
+					stack.append(self._GenerationLinks(relative))
+					break
+			else:
+				stack.pop()
+		
+	def _GenerationLinks(self, person):
 		for parent in person.Parents:
-			if parent.Generation is None:
-				self._SetGeneration(parent, person.Generation + 1)
+			yield parent, person.Generation + 1
 		for child in person.Children:
-			if child.Generation is None:
-				self._SetGeneration(child, person.Generation - 1)
+			yield child, person.Generation - 1
 		for spouse in person.Spouses:
-			if spouse.Generation is None:
-				self._SetGeneration(spouse, person.Generation)
-		
-	def _DoAllPeopleHaveAGeneration(self):
-		for person in self.people:
-			if person.Generation is None:
-				return False
-		return True
+			yield spouse, person.Generation
 		
 	def GetPersonFromID(self, id):
-		p = [person for person in self.people if person.GetId() == id]
-		assert(len(p) == 1)
-		return p[0]
+		p = self._people_by_id.get(id)
+		assert(p is not None)
+		return p
+
+	def GetNameIndex(self):
+		# Built on first use; ReindexPerson keeps it current after name edits.
+		if self._name_index is None:
+			self._name_index = NameIndex(self.people)
+		return self._name_index
+
+	def ReindexPerson(self, person):
+		if self._name_index is not None:
+			self._name_index.Update(person)
+
+	def SearchPeople(self, query, limit=20):
+		return [self.GetPersonFromID(pid) for pid in self.GetNameIndex().Search(query, limit)]
+
+	def FindDuplicates(self, min_score=0.75, max_block_size=50, window=10, workers=None):
+		from family_tree_dedup import find_duplicates
+		return find_duplicates(self.people, min_score=min_score, max_block_size=max_block_size, window=window, workers=workers)
+
+	def GetStatistics(self):
+		# Column arrays for per-generation / per-component aggregates (needs NumPy).
+		from family_tree_stats import TreeColumns
+		return TreeColumns.FromFamilyTree(self)
+
+	def _Expand(self, person):
+		# Hook for backends that create relatives on demand; every Person is fully
+		# linked once this returns. All links already exist in an eagerly loaded tree.
+		pass
 
 	def IsAncestor(self, potential_ancestor, subject) -> bool:
-		return potential_ancestor in self.GetAncestorsOf(subject)
+		return potential_ancestor in self.iter_ancestors(subject)
 
 	def GetAncestorsOf(self, subject: Person):
-		ancestors = set()
-		for p in subject.Parents:
-			ancestors.add(p)
-			for a in self.GetAncestorsOf(p):
-				ancestors.add(a)
-		return ancestors
+		return set(self.iter_ancestors(subject))
+
+	def iter_ancestors(self, subject: Person, max_depth=None, with_distance=False):
+		"""
+		Yield the ancestors of subject breadth-first, parents first, each person once.
+		max_depth limits the number of generations walked; with_distance yields
+		(person, generations_up) pairs instead of people.
+		"""
+		return self._IterBreadthFirst(subject, lambda p: p.Parents, max_depth, with_distance)
+
+	def iter_descendants(self, subject: Person, max_depth=None, with_distance=False):
+		"""
+		Yield the descendants of subject breadth-first, children first, each person once.
+		"""
+		return self._IterBreadthFirst(subject, lambda p: p.Children, max_depth, with_distance)
+
+	def iter_relatives(self, subject: Person, max_depth=None, with_distance=False):
+		"""
+		Yield everyone connected to subject through spouse, parent and child links,
+		breadth-first by number of links, each person once.
+		"""
+		return self._IterBreadthFirst(subject, lambda p: p.Spouses + p.Parents + p.Children, max_depth, with_distance)
+
+	def _IterBreadthFirst(self, subject, neighbours, max_depth, with_distance):
+		# The subject counts as visited, so pedigree collapse or bad data with a
+		# person listed as their own ancestor cannot loop forever.
+		visited = {subject.GetId()}
+		q = deque()
+		q.append((subject, 0))
+		while q:
+			person, distance = q.popleft()
+			if max_depth is not None and distance >= max_depth:
+				continue
+			self._Expand(person)
+			for relative in neighbours(person):
+				if relative.GetId() in visited:
+					continue
+				visited.add(relative.GetId())
+				q.append((relative, distance + 1))
+				yield (relative, distance + 1) if with_distance else relative
 
 		
 	def GetLocalPeople(self, center_id, max_up=2, max_down=2, max_nodes=200):
-		center = self.GetPersonFromID(center_id)
-		included = set()
-		best = {}
-		q = deque()
-		q.append((center, 0, 0))
-		best[center.GetId()] = (0, 0)
-		included.add(center)
-
-		while q and len(included) < max_nodes:
-			person, up_used, down_used = q.popleft()
-
-			for spouse in person.Spouses:
-				spouse_id = spouse.GetId()
-				state = (up_used, down_used)
-				prev = best.get(spouse_id)
-				if prev is None or state < prev:
-					best[spouse_id] = state
-					included.add(spouse)
-					q.append((spouse, up_used, down_used))
-				if len(included) >= max_nodes:
-					break
-			if len(included) >= max_nodes:
-				break
-
-			if up_used < max_up:
-				for parent in person.Parents:
-					parent_id = parent.GetId()
-					state = (up_used + 1, down_used)
-					prev = best.get(parent_id)
-					if prev is None or state < prev:
-						best[parent_id] = state
-						included.add(parent)
-						q.append((parent, up_used + 1, down_used))
-					if len(included) >= max_nodes:
-						break
-			if len(included) >= max_nodes:
-				break
-
-			if down_used < max_down:
-				for child in person.Children:
-					child_id = child.GetId()
-					state = (up_used, down_used + 1)
-					prev = best.get(child_id)
-					if prev is None or state < prev:
-						best[child_id] = state
-						included.add(child)
-						q.append((child, up_used, down_used + 1))
-					if len(included) >= max_nodes:
-						break
-
-		return list(included)
+		return self.GetLocalNeighbourhood(center_id, max_up, max_down, max_nodes)[0]
+		
+	def GetLocalNeighbourhood(self, center_id, max_up=2, max_down=2, max_nodes=200):
+		"""
+		The local people, closest relatives first, and a Cutoff describing where
+		max_nodes truncated the neighbourhood (None when nothing was left out).
+		"""
+		self.GetPersonFromID(center_id)
+		local_ids, cutoff = select_local_neighbourhood(center_id, self._NeighbourIds, max_up, max_down, max_nodes)
+		return [self.GetPersonFromID(pid) for pid in local_ids], cutoff
+		
+	def GetLocalNeighbourhoods(self, center_ids, max_up=2, max_down=2, max_nodes=200, workers=None, min_pool_centers=256):
+		"""
+		GetLocalPeople and GetLocalMarriages for many centers with the same limits, as
+		{center_id: (people, marriages)}. Neighbour lookups and marriage membership are
+		memoised across centers, but each center is walked on its own. workers > 1 runs
+		the selection on a process pool once there are more than min_pool_centers
+		distinct centers (see select_local_ids_batch).
+		"""
+		center_ids = list(center_ids)
+		for center_id in center_ids:
+			self.GetPersonFromID(center_id)
+		selected = select_local_ids_batch(
+			center_ids,
+			SharedNeighbours(self._NeighbourIds),
+			max_up=max_up,
+			max_down=max_down,
+			max_nodes=max_nodes,
+			workers=workers,
+			min_pool_centers=min_pool_centers,
+			# Building the table walks the whole tree, so it is left to the batch to
+			# decide whether the pool is worth it.
+			adjacency=self._AdjacencyTable,
+		)
+		# Marriage membership is also read once per marriage for the whole batch.
+		marriage_records = {}
+		neighbourhoods = {}
+		for center_id, local_ids in selected.items():
+			local = set(local_ids)
+			people = []
+			candidates = {}
+			for pid in local_ids:
+				person = self.GetPersonFromID(pid)
+				self._Expand(person)
+				people.append(person)
+				for marriage in person.Marriages:
+					candidates[marriage.GetId()] = marriage
+			local_marriages = []
+			for mid, marriage in candidates.items():
+				record = marriage_records.get(mid)
+				if record is None:
+					record = (marriage.Person1.GetId(), marriage.Person2.GetId(), [c.GetId() for c in marriage.Children], int(mid[1:]))
+					marriage_records[mid] = record
+				if is_local_marriage(record[0], record[1], record[2], local):
+					local_marriages.append(marriage)
+			local_marriages.sort(key=lambda m: marriage_records[m.GetId()][3])
+			neighbourhoods[center_id] = (people, local_marriages)
+		return neighbourhoods
+		
+	def _NeighbourIds(self, pid):
+		person = self.GetPersonFromID(pid)
+		self._Expand(person)
+		return (
+			[spouse.GetId() for spouse in person.Spouses],
+			[parent.GetId() for parent in person.Parents],
+			[child.GetId() for child in person.Children],
+		)
+		
+	def _AdjacencyTable(self):
+		return {person.GetId(): self._NeighbourIds(person.GetId()) for person in self.people}
 		
 	def GetLocalMarriages(self, local_people):
-		local_ids = {p.GetId() for p in local_people}
-		local_marriages = []
-		for marriage in self.marriages:
-			p1_in = marriage.Person1.GetId() in local_ids
-			p2_in = marriage.Person2.GetId() in local_ids
-			child_in = any(c.GetId() in local_ids for c in marriage.Children)
-			if (p1_in and p2_in) or (child_in and (p1_in or p2_in)):
-				local_marriages.append(marriage)
-		return local_marriages
+		return select_local_marriages(local_people)
 		
 if __name__ == "__main__":
 	familyTree = FamilyTree("data/my_people.json", "data/my_marriages.json")
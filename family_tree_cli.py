@@ -0,0 +1,186 @@
+"""
+Command-line entry point.
+Subcommands view, layout, ancestors and stats over a JSON, lazily indexed or SQLite
+tree. Only argparse is imported up front: tkinter, the layout engine and the tree
+backends are imported by the subcommand that needs them, and the viewer window is
+shown before the tree has finished loading.
+"""
+
+import argparse
+import sys
+import threading
+import time
+from typing import List, Optional
+
+_STARTED = time.perf_counter()
+
+
+class _Timer():
+    """Milliseconds since this module was imported, reported on stderr with --timings."""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+
+    def Mark(self, label: str):
+        if self.enabled:
+            print(f'{label}: {(time.perf_counter() - _STARTED) * 1000:.1f} ms', file=sys.stderr)
+
+
+def _load_tree(args):
+    if args.db:
+        from family_tree_sqlite import SqliteFamilyTree
+        return SqliteFamilyTree(args.db)
+    if args.lazy:
+        from family_tree_lazy import LazyFamilyTree
+        return LazyFamilyTree(args.people, args.marriages)
+    from FamilyTree import FamilyTree
+    return FamilyTree(args.people, args.marriages, validate=not args.no_validate)
+
+
+def _center(tree, args, parser):
+    try:
+        return tree.GetPersonFromID(args.center)
+    except AssertionError:
+        parser.error(f'no person with id {args.center}')
+
+
+def _view(args, parser, timer):
+    import tkinter as tk
+
+    root = tk.Tk()
+    root.title("Family Tree Viewer")
+    root.geometry("1200x800")
+    status = tk.Label(root, text=f'Loading {args.db or args.people} ...')
+    status.pack(expand=True)
+    root.update()
+    timer.Mark("window shown")
+
+    # Only the imports and the load run on the thread; every Tk call stays on the main
+    # thread. A SQLite connection can only be used on the thread that opened it, and
+    # opening one is instant, so --db trees are opened on the main thread in poll().
+    loaded = {}
+
+    def open_tree():
+        try:
+            tree = _load_tree(args)
+            tree.GetPersonFromID(args.center)
+            loaded["tree"] = tree
+        except AssertionError:
+            loaded["error"] = f'No person with id {args.center}'
+        except Exception as e:
+            loaded["error"] = f'Could not load the tree: {e}'
+
+    def load():
+        try:
+            from family_tree_viewer import FamilyTreeViewer
+            loaded["viewer"] = FamilyTreeViewer
+            if args.db:
+                # Imported here so poll() only has to connect.
+                import family_tree_sqlite
+            else:
+                open_tree()
+        except Exception as e:
+            loaded["error"] = f'Could not load the viewer: {e}'
+
+    def poll():
+        if loader.is_alive():
+            root.after(20, poll)
+            return
+        if args.db and "error" not in loaded:
+            open_tree()
+        timer.Mark("tree loaded")
+        if "error" in loaded:
+            status.config(text=loaded["error"])
+            return
+        status.destroy()
+        viewer = loaded["viewer"](root, loaded["tree"], center_id=args.center, layout_mode=args.mode)
+        viewer.pack(fill=tk.BOTH, expand=True)
+        root.update_idletasks()
+        timer.Mark("tree shown")
+
+    loader = threading.Thread(target=load, daemon=True)
+    loader.start()
+    root.after(20, poll)
+    root.mainloop()
+
+
+def _layout(args, parser, timer):
+    import json
+    from family_tree_layout import compute_layout
+
+    tree = _load_tree(args)
+    timer.Mark("tree loaded")
+    _center(tree, args, parser)
+    layout = compute_layout(tree, args.center, args.mode, max_up=args.max_up, max_down=args.max_down, max_nodes=args.max_nodes)
+    layout["positions"] = {str(pid): [x, y] for pid, (x, y) in layout["positions"].items()}
+    timer.Mark("layout computed")
+    json.dump(layout, sys.stdout, indent=args.indent)
+    print()
+
+
+def _ancestors(args, parser, timer):
+    tree = _load_tree(args)
+    timer.Mark("tree loaded")
+    person = _center(tree, args, parser)
+    for ancestor in sorted(tree.GetAncestorsOf(person), key=lambda p: p.GetId()):
+        print(f'{ancestor.GetId()}\t{ancestor.GetFullName()}')
+
+
+def _stats(args, parser, timer):
+    if args.db or args.lazy:
+        parser.error("stats needs the full tree; drop --db/--lazy")
+    tree = _load_tree(args)
+    timer.Mark("tree loaded")
+    columns = tree.GetStatistics()
+    mask = columns.BornBetween(*args.born) if args.born else None
+    stats = columns.ByGeneration(mask)
+    timer.Mark("statistics computed")
+
+    print("generation  people  male  female  mean lifespan")
+    for i, key in enumerate(stats["key"]):
+        print(f'{key:>10}  {stats["people"][i]:>6}  {stats["male"][i]:>4}  {stats["female"][i]:>6}  {stats["lifespan_mean"][i]:>13.1f}')
+
+
+def main(argv: Optional[List[str]] = None):
+    data = argparse.ArgumentParser(add_help=False)
+    data.add_argument("--people", default="data/example_people.json")
+    data.add_argument("--marriages", default="data/example_marriages.json")
+    source = data.add_mutually_exclusive_group()
+    source.add_argument("--db", help="read a SQLite database made by family_tree_sqlite instead of the JSON files")
+    source.add_argument("--lazy", action="store_true", help="load people from the JSON files on demand")
+    data.add_argument("--no-validate", action="store_true", help="skip validation when loading the JSON files")
+    data.add_argument("--timings", action="store_true", help="report milliseconds since startup on stderr")
+
+    centered = argparse.ArgumentParser(add_help=False, parents=[data])
+    centered.add_argument("--center", type=int, default=6)
+    # family_tree_layout.LAYOUT_MODES, spelled out so parsing does not import the layout engine.
+    centered.add_argument("--mode", choices=("canvas", "pedigree", "fan", "descendants"), default="canvas")
+
+    parser = argparse.ArgumentParser(description="Family tree tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    view = commands.add_parser("view", parents=[centered], help="open the viewer")
+    view.set_defaults(run=_view)
+
+    layout = commands.add_parser("layout", parents=[centered], help="print a canvas layout as JSON")
+    layout.add_argument("--max-up", type=int, default=2)
+    layout.add_argument("--max-down", type=int, default=2)
+    layout.add_argument("--max-nodes", type=int, default=200)
+    layout.add_argument("--indent", type=int, default=None)
+    layout.set_defaults(run=_layout)
+
+    ancestors = commands.add_parser("ancestors", parents=[centered], help="list the ancestors of the center person")
+    ancestors.set_defaults(run=_ancestors)
+
+    stats = commands.add_parser("stats", parents=[data], help="per-generation statistics")
+    stats.add_argument("--born", nargs=2, type=int, metavar=("START", "END"))
+    stats.set_defaults(run=_stats)
+
+    args = parser.parse_args(argv)
+    timer = _Timer(args.timings)
+    timer.Mark("arguments parsed")
+    args.run(args, commands.choices[args.command], timer)
+
+
+if __name__ == "__main__":
+    main()
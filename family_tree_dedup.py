@@ -0,0 +1,215 @@
+"""
+Duplicate person detection.
+Groups people by cheap blocking keys (name phonetics, gender, generation, shared parents
+and spouses), scores only the pairs that share a block, and ranks merge suggestions.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from FamilyTree import parse_year
+from family_tree_search import normalize_tokens, soundex
+
+
+class MergeSuggestion(NamedTuple):
+    score: float
+    person1: int
+    person2: int
+    reasons: Tuple[str, ...]
+
+
+# Flattened, picklable view of a Person used for blocking and scoring:
+# (id, first, last, maiden, gender, generation, birth year, death year, parent ids, spouse ids)
+PersonRecord = Tuple
+
+
+def _key_name(text) -> str:
+    return " ".join(normalize_tokens(text))
+
+
+def person_record(person) -> PersonRecord:
+    return (
+        person.GetId(),
+        _key_name(person.FirstName),
+        _key_name(person.LastName),
+        _key_name(person.MaidenName),
+        person.Gender,
+        person.Generation,
+        parse_year(person.BirthDate),
+        parse_year(person.DeathDate),
+        frozenset(p.GetId() for p in person.Parents),
+        frozenset(s.GetId() for s in person.Spouses),
+    )
+
+
+def _phonetic(name: str) -> str:
+    tokens = name.split()
+    return soundex(tokens[0]) if tokens else ""
+
+
+def blocking_keys(record: PersonRecord) -> List[Tuple]:
+    """
+    Keys that two duplicates are likely to share. Surname keys use both the last and
+    maiden name so a married and an unmarried entry for the same woman still meet.
+    """
+    pid, first, last, maiden, gender, generation, _, _, parents, spouses = record
+    first_key = _phonetic(first)
+    keys = []
+    for surname in {last, maiden} - {""}:
+        keys.append(("exact", first, surname))
+        keys.append(("name", first_key, _phonetic(surname), gender))
+    if generation is not None:
+        keys.append(("generation", first_key, gender, generation))
+    if parents:
+        keys.append(("parents", parents, first_key))
+    for spouse in spouses:
+        keys.append(("spouse", spouse, gender))
+    if not keys:
+        keys.append(("first", first_key, gender))
+    return keys
+
+
+def _similarity(a: str, b: str) -> float:
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def score_pair(a: PersonRecord, b: PersonRecord) -> Tuple[float, Tuple[str, ...]]:
+    """Score in [0, 1] that a and b are the same person, with the evidence used."""
+    _, first_a, last_a, maiden_a, gender_a, gen_a, birth_a, death_a, parents_a, spouses_a = a
+    _, first_b, last_b, maiden_b, gender_b, gen_b, birth_b, death_b, parents_b, spouses_b = b
+    if gender_a != gender_b:
+        return 0.0, ()
+    if birth_a is not None and birth_b is not None and abs(birth_a - birth_b) > 2:
+        return 0.0, ()
+
+    reasons = []
+    score = 0.4 * _similarity(first_a, first_b)
+    surname = max(
+        _similarity(x, y)
+        for x in (last_a, maiden_a)
+        for y in (last_b, maiden_b)
+    )
+    score += 0.3 * surname
+    if first_a == first_b:
+        reasons.append("same first name")
+    if surname == 1.0:
+        reasons.append("same surname")
+
+    if birth_a is not None and birth_a == birth_b:
+        score += 0.1
+        reasons.append("same birth year")
+    if death_a is not None and death_a == death_b:
+        score += 0.05
+        reasons.append("same death year")
+    if gen_a is not None and gen_a == gen_b:
+        score += 0.05
+    if parents_a & parents_b:
+        score += 0.1
+        reasons.append("shared parents")
+    if spouses_a & spouses_b:
+        score += 0.1
+        reasons.append("shared spouse")
+    return min(score, 1.0), tuple(reasons)
+
+
+def candidate_pairs(records: Iterable[PersonRecord], max_block_size: int = 50, window: int = 10) -> List[Tuple[int, int]]:
+    """
+    Index pairs that share at least one blocking key. A block larger than max_block_size
+    (a common name at scale) is not paired all-against-all: its members are sorted by
+    birth year, generation and death year, and each is paired with up to the next
+    window - 1 in that order (a sorted-neighbourhood window), stopping at births more
+    than 2 years later, which score_pair would reject. The pair count grows with
+    the number of people rather than its square, and likely duplicates in big blocks
+    still meet.
+    """
+    records = list(records)
+    blocks: Dict[Tuple, List[int]] = {}
+    for i, record in enumerate(records):
+        for key in blocking_keys(record):
+            blocks.setdefault(key, []).append(i)
+    pairs = set()
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        if len(members) <= max_block_size:
+            pairs.update(combinations(members, 2))
+            continue
+        members = sorted(members, key=lambda i: _window_key(records[i]))
+        for n, i in enumerate(members):
+            birth = records[i][6]
+            for j in members[n + 1:n + window]:
+                # score_pair rejects births more than 2 years apart, and later
+                # members are born later still.
+                if birth is not None and (records[j][6] is None or records[j][6] - birth > 2):
+                    break
+                pairs.add((i, j) if i < j else (j, i))
+    return sorted(pairs)
+
+
+def _window_key(record: PersonRecord) -> Tuple:
+    # Unknown values sort last, each group kept in id order.
+    _, _, _, _, _, generation, birth, death, _, _ = record
+    return (
+        birth is None, birth or 0,
+        generation is None, generation or 0,
+        death is None, death or 0,
+        record[0],
+    )
+
+
+def _score_chunk(records: List[PersonRecord], pairs: List[Tuple[int, int]], min_score: float) -> List[MergeSuggestion]:
+    suggestions = []
+    for i, j in pairs:
+        a = records[i]
+        b = records[j]
+        # A person cannot be a duplicate of their own parent or spouse.
+        if b[0] in a[8] or a[0] in b[8] or b[0] in a[9]:
+            continue
+        score, reasons = score_pair(a, b)
+        if score >= min_score:
+            suggestions.append(MergeSuggestion(round(score, 4), a[0], b[0], reasons))
+    return suggestions
+
+
+def find_duplicates(
+    people,
+    min_score: float = 0.75,
+    max_block_size: int = 50,
+    window: int = 10,
+    workers: Optional[int] = None,
+    chunk_size: int = 20000,
+) -> List[MergeSuggestion]:
+    """
+    Ranked merge suggestions for people that look like the same person, best first.
+    workers > 1 scores candidate pairs on a process pool.
+    """
+    records = [person_record(p) for p in people]
+    pairs = candidate_pairs(records, max_block_size=max_block_size, window=window)
+
+    if workers is not None and workers > 1 and len(pairs) > chunk_size:
+        suggestions = []
+        chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = []
+            for chunk in chunks:
+                needed = sorted({i for pair in chunk for i in pair})
+                remap = {old: new for new, old in enumerate(needed)}
+                futures.append(pool.submit(
+                    _score_chunk,
+                    [records[i] for i in needed],
+                    [(remap[i], remap[j]) for i, j in chunk],
+                    min_score,
+                ))
+            for future in futures:
+                suggestions.extend(future.result())
+    else:
+        suggestions = _score_chunk(records, pairs, min_score)
+
+    suggestions.sort(key=lambda s: (-s.score, s.person1, s.person2))
+    return suggestions
@@ -0,0 +1,324 @@
+"""
+Streaming GEDCOM import and export.
+Reads INDI/FAM records one at a time into Person and Marriage objects, resolving
+cross-references once every record has been seen, and writes a FamilyTree back out
+record by record.
+"""
+
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from FamilyTree import FamilyTree, Marriage, Person
+
+
+# (level, tag, value) for each line of a record; the level-0 line comes first.
+GedcomLine = Tuple[int, str, str]
+
+_SEX_TO_GENDER = {"M": "Male", "F": "Female"}
+_GENDER_TO_SEX = {"Male": "M", "Female": "F"}
+
+
+def _parse_line(raw: str) -> Optional[Tuple[int, Optional[str], str, str]]:
+    parts = raw.strip().split(" ", 2)
+    if len(parts) < 2 or not parts[0].isdigit():
+        return None
+    level = int(parts[0])
+    xref = None
+    if parts[1].startswith("@"):
+        xref = parts[1]
+        rest = parts[2].split(" ", 1) if len(parts) > 2 else [""]
+        tag = rest[0]
+        value = rest[1] if len(rest) > 1 else ""
+    else:
+        tag = parts[1]
+        value = parts[2] if len(parts) > 2 else ""
+    return level, xref, tag.upper(), value
+
+
+def iter_gedcom_records(file: TextIO) -> Iterator[Tuple[str, Optional[str], List[GedcomLine]]]:
+    """
+    Yield (tag, xref, lines) per level-0 record, reading the file line by line.
+    CONC/CONT continuation lines are folded into the value they continue.
+    """
+    tag = None
+    xref = None
+    lines: List[GedcomLine] = []
+    for raw in file:
+        parsed = _parse_line(raw.lstrip("\ufeff"))
+        if parsed is None:
+            continue
+        level, line_xref, line_tag, value = parsed
+        if level == 0:
+            if tag is not None:
+                yield tag, xref, lines
+            tag, xref, lines = line_tag, line_xref, [(0, line_tag, value)]
+            continue
+        if line_tag in ("CONC", "CONT") and lines:
+            prev_level, prev_tag, prev_value = lines[-1]
+            value = prev_value + ("\n" if line_tag == "CONT" else "") + value
+            lines[-1] = (prev_level, prev_tag, value)
+            continue
+        lines.append((level, line_tag, value))
+    if tag is not None:
+        yield tag, xref, lines
+
+
+def _split_name(value: str) -> Tuple[List[str], str, str]:
+    """'John Paul /Smith/ Jr.' -> (['John', 'Paul'], 'Smith', 'Jr.')"""
+    if "/" in value:
+        given, _, rest = value.partition("/")
+        surname, _, suffix = rest.partition("/")
+    else:
+        given, surname, suffix = value, "", ""
+    return given.split(), surname.strip(), suffix.strip()
+
+
+def _substructures(lines: List[GedcomLine], start: int) -> Iterator[Tuple[int, GedcomLine]]:
+    """Lines nested below lines[start]."""
+    level = lines[start][0]
+    for i in range(start + 1, len(lines)):
+        if lines[i][0] <= level:
+            return
+        yield i, lines[i]
+
+
+def _person_from_indi(lines: List[GedcomLine], pid: int) -> Tuple[Person, List[Tuple[str, str]]]:
+    """The person, and their FAMC links as (family xref, pedigree) in file order."""
+    names = []  # (given, surname, suffix, name type)
+    famc = []
+    married_surname = ""
+    gender = None
+    birth = None
+    death = None
+    for i, (level, tag, value) in enumerate(lines):
+        if level != 1:
+            continue
+        if tag == "NAME":
+            given, surname, suffix = _split_name(value)
+            name_type = ""
+            for _, (_, sub_tag, sub_value) in _substructures(lines, i):
+                if sub_tag == "GIVN" and not given:
+                    given = sub_value.split()
+                elif sub_tag == "SURN" and not surname:
+                    surname = sub_value.strip()
+                elif sub_tag == "NSFX" and not suffix:
+                    suffix = sub_value.strip()
+                elif sub_tag == "TYPE":
+                    name_type = sub_value.strip().lower()
+                elif sub_tag == "_MARNM":
+                    married_surname = sub_value.strip()
+            names.append((given, surname, suffix, name_type))
+        elif tag == "_MARNM":
+            married_surname = value.strip()
+        elif tag == "FAMC":
+            pedigree = next((v for _, (_, t, v) in _substructures(lines, i) if t == "PEDI"), "birth")
+            famc.append((value.strip(), pedigree.strip().lower() or "birth"))
+        elif tag == "SEX":
+            gender = _SEX_TO_GENDER.get(value.strip().upper(), "Unknown")
+        elif tag in ("BIRT", "DEAT"):
+            date = next((v for _, (_, t, v) in _substructures(lines, i) if t == "DATE"), None)
+            if tag == "BIRT":
+                birth = date
+            else:
+                death = date
+
+    primary = names[0] if names else ([], "", "", "")
+    person = Person(primary[0][0] if primary[0] else "", gender or "Unknown", pid)
+    person.MiddleNames = primary[0][1:]
+    person.LastName = primary[1]
+    person.Suffix = primary[2]
+    for given, surname, suffix, name_type in names[1:]:
+        if name_type in ("birth", "maiden"):
+            person.MaidenName = surname
+        elif name_type == "married" and primary[3] in ("birth", "maiden"):
+            person.MaidenName = primary[1]
+            person.LastName = surname
+    if married_surname and married_surname != person.LastName:
+        person.MaidenName = person.MaidenName or person.LastName
+        person.LastName = married_surname
+    person.BirthDate = birth
+    person.DeathDate = death
+    return person, famc
+
+
+def _family_from_fam(lines: List[GedcomLine]):
+    husband = None
+    wife = None
+    children = []
+    date = None
+    status = None
+    for i, (level, tag, value) in enumerate(lines):
+        if level != 1:
+            continue
+        if tag == "HUSB":
+            husband = value.strip()
+        elif tag == "WIFE":
+            wife = value.strip()
+        elif tag == "CHIL":
+            children.append(value.strip())
+        elif tag == "MARR":
+            date = next((v for _, (_, t, v) in _substructures(lines, i) if t == "DATE"), date)
+        elif tag == "DIV":
+            status = "Divorced"
+    return husband, wife, children, date, status
+
+
+def read_gedcom_records(path: str, encoding: str = "utf-8") -> Tuple[List[Person], List[Marriage]]:
+    """
+    Stream a GEDCOM file into Person and Marriage objects. Only parsed people and compact
+    family tuples are kept; the raw text of each record is dropped once it is parsed.
+    People keep the number in their xref (@I12@ -> 12) as ID when it is free; others get
+    IDs after the largest one in use. A family with a single known parent
+    gets an "Unknown" placeholder spouse so the child keeps a parent link.
+
+    Each child is linked as a child of one birth family only: the first FAMC without a
+    non-birth PEDI (adopted, foster, sealing, ...), else the first family listing them.
+    Their other families keep them in Marriage.OtherChildren with the pedigree, so an
+    adoption does not give anyone three or four parents.
+    """
+    people: List[Person] = []
+    people_by_xref: Dict[str, Person] = {}
+    famc_by_xref: Dict[str, List[Tuple[str, str]]] = {}
+    used_ids = set()
+    families = []
+    with open(path, "r", encoding=encoding, errors="replace") as file:
+        for tag, xref, lines in iter_gedcom_records(file):
+            if tag == "INDI" and xref is not None:
+                digits = "".join(c for c in xref if c.isdigit())
+                pid = int(digits) if digits and int(digits) not in used_ids else None
+                person, famc = _person_from_indi(lines, pid)
+                used_ids.add(pid)
+                people.append(person)
+                people_by_xref[xref] = person
+                famc_by_xref[xref] = famc
+            elif tag == "FAM" and xref is not None:
+                families.append((xref, *_family_from_fam(lines)))
+
+    next_id = max((i for i in used_ids if i is not None), default=-1) + 1
+    for person in people:
+        if person.ID is None:
+            person.ID = next_id
+            next_id += 1
+
+    birth_family: Dict[str, str] = {}
+    for child_ref, famc in famc_by_xref.items():
+        for family_ref, pedigree in famc:
+            if pedigree == "birth":
+                birth_family[child_ref] = family_ref
+                break
+    for family_ref, _, _, child_refs, _, _ in families:
+        for child_ref in child_refs:
+            birth_family.setdefault(child_ref, family_ref)
+
+    marriages = []
+    for family_ref, husband_ref, wife_ref, child_refs, date, status in families:
+        husband = people_by_xref.get(husband_ref)
+        wife = people_by_xref.get(wife_ref)
+        children = []
+        other_children = []
+        for child_ref in child_refs:
+            if child_ref not in people_by_xref:
+                continue
+            if birth_family.get(child_ref) == family_ref:
+                if people_by_xref[child_ref] not in children:
+                    children.append(people_by_xref[child_ref])
+            else:
+                pedigree = dict(famc_by_xref.get(child_ref, ())).get(family_ref, "birth")
+                other_children.append((people_by_xref[child_ref], pedigree))
+        if husband is None and wife is None:
+            continue
+        if husband is None or wife is None:
+            if not children and not other_children:
+                continue
+            known = husband or wife
+            placeholder = Person("Unknown", "Female" if known is husband else "Male", next_id)
+            next_id += 1
+            people.append(placeholder)
+            husband, wife = (known, placeholder) if known is husband else (placeholder, known)
+        marriage = Marriage(husband, wife, children)
+        marriage.Date = date
+        marriage.Status = status
+        marriage.OtherChildren = other_children
+        marriages.append(marriage)
+    return people, marriages
+
+
+def read_gedcom(path: str, encoding: str = "utf-8", validate: bool = True) -> FamilyTree:
+    people, marriages = read_gedcom_records(path, encoding=encoding)
+    return FamilyTree.FromPeopleAndMarriages(people, marriages, validate=validate)
+
+
+def _write(file: TextIO, level: int, tag: str, value=None, xref: Optional[str] = None):
+    parts = [str(level)]
+    if xref:
+        parts.append(xref)
+    parts.append(tag)
+    if value:
+        parts.append(str(value))
+    file.write(" ".join(parts) + "\n")
+
+
+def _person_xref(person) -> str:
+    return f'@I{person.GetId()}@'
+
+
+def write_gedcom(family_tree, path: str):
+    """Write every person and marriage of family_tree as GEDCOM 5.5.1, one record at a time."""
+    family_xrefs = {}
+    families_as_child: Dict[int, List[Tuple[str, str]]] = {}
+    for i, marriage in enumerate(family_tree.marriages):
+        family_xrefs[marriage.GetId()] = f'@F{i}@'
+        for child in marriage.Children:
+            families_as_child.setdefault(child.GetId(), []).append((f'@F{i}@', "birth"))
+        for child, pedigree in marriage.OtherChildren:
+            families_as_child.setdefault(child.GetId(), []).append((f'@F{i}@', pedigree))
+
+    with open(path, "w", encoding="utf-8", newline="\n") as file:
+        _write(file, 0, "HEAD")
+        _write(file, 1, "SOUR", "FamilyTree")
+        _write(file, 1, "GEDC")
+        _write(file, 2, "VERS", "5.5.1")
+        _write(file, 2, "FORM", "LINEAGE-LINKED")
+        _write(file, 1, "CHAR", "UTF-8")
+
+        for person in family_tree.people:
+            _write(file, 0, "INDI", xref=_person_xref(person))
+            given = " ".join([person.FirstName] + list(person.MiddleNames)).strip()
+            name = f'{given} /{person.LastName}/'
+            if person.Suffix:
+                name += " " + person.Suffix
+            _write(file, 1, "NAME", name)
+            for tag, value in (("GIVN", given), ("SURN", person.LastName), ("NSFX", person.Suffix)):
+                if value:
+                    _write(file, 2, tag, value)
+            if person.MaidenName:
+                _write(file, 2, "TYPE", "married")
+                _write(file, 1, "NAME", f'{given} /{person.MaidenName}/')
+                _write(file, 2, "TYPE", "birth")
+            _write(file, 1, "SEX", _GENDER_TO_SEX.get(person.Gender, "U"))
+            for tag, date in (("BIRT", person.BirthDate), ("DEAT", person.DeathDate)):
+                if date:
+                    _write(file, 1, tag)
+                    _write(file, 2, "DATE", date)
+            for marriage in person.Marriages:
+                _write(file, 1, "FAMS", family_xrefs[marriage.GetId()])
+            for family_xref, pedigree in families_as_child.get(person.GetId(), ()):
+                _write(file, 1, "FAMC", family_xref)
+                if pedigree != "birth":
+                    _write(file, 2, "PEDI", pedigree)
+
+        for marriage in family_tree.marriages:
+            _write(file, 0, "FAM", xref=family_xrefs[marriage.GetId()])
+            husband, wife = marriage.Person1, marriage.Person2
+            if husband.Gender == "Female" and wife.Gender != "Female":
+                husband, wife = wife, husband
+            _write(file, 1, "HUSB", _person_xref(husband))
+            _write(file, 1, "WIFE", _person_xref(wife))
+            if marriage.Date:
+                _write(file, 1, "MARR")
+                _write(file, 2, "DATE", marriage.Date)
+            if marriage.Status == "Divorced":
+                _write(file, 1, "DIV", "Y")
+            for child in marriage.Children + [child for child, _ in marriage.OtherChildren]:
+                _write(file, 1, "CHIL", _person_xref(child))
+
+        _write(file, 0, "TRLR")
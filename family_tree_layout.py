@@ -1,10 +1,12 @@
 """
 Family tree layout engine.
-Provides canvas layout with generation ranks, marriage-aware ordering, and pseudo-node constraints.
+Provides canvas layout with generation ranks, marriage-aware ordering, and pseudo-node constraints,
+plus closed-form pedigree, fan and descendant charts.
 """
 
+import math
 from collections import deque
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any
 
 
 def compute_canvas_layout(
@@ -19,9 +21,10 @@ def compute_canvas_layout(
 ) -> Dict[str, Any]:
     """
     Compute a deterministic canvas layout for a local subgraph around a center person.
-    Returns a dict with people, marriages, and (x, y) positions.
+    Returns a dict with people, marriages, (x, y) positions, and the cutoff (distance and
+    truncated people) when max_nodes left relatives out.
     """
-    local_people = family_tree.GetLocalPeople(center_id, max_up=max_up, max_down=max_down, max_nodes=max_nodes)
+    local_people, cutoff = family_tree.GetLocalNeighbourhood(center_id, max_up=max_up, max_down=max_down, max_nodes=max_nodes)
     local_people_by_id = {p.GetId(): p for p in local_people}
     local_marriages = family_tree.GetLocalMarriages(local_people)
 
@@ -48,7 +51,7 @@ def compute_canvas_layout(
     for pid, gg in gen.items():
         gens.setdefault(gg, []).append(local_people_by_id[pid])
     if not gens:
-        return {"center_id": center_id, "people": [], "marriages": [], "positions": {}}
+        return {"center_id": center_id, "people": [], "marriages": [], "positions": {}, "cutoff": None}
     min_g = min(gens.keys())
     max_g = max(gens.keys())
 
@@ -173,7 +176,8 @@ def compute_canvas_layout(
             parents = [par for par in (p1, p2) if par.GetId() in idx_prev]
             b = sum(idx_prev[par.GetId()] for par in parents) / len(parents) if parents else 0
             children.sort(key=lambda c: (cur_idx[c.GetId()], c.GetId()))
-            blocks.append((0, b, marriage.GetId(), children))
+            # Ties go by marriage ordinal: backends number marriages differently, but in file order.
+            blocks.append((0, b, int(marriage.GetId()[1:]), children))
 
         # Remaining singles.
         for p in lst:
@@ -210,7 +214,7 @@ def compute_canvas_layout(
             child_positions = [idx_next[c.GetId()] for c in marriage.Children if gen.get(c.GetId()) == gg + 1 and c.GetId() in idx_next]
             b = sum(child_positions) / len(child_positions) if child_positions else (cur_idx[p1.GetId()] + cur_idx[p2.GetId()]) / 2
             pair = [p1, p2] if cur_idx[p1.GetId()] <= cur_idx[p2.GetId()] else [p2, p1]
-            blocks.append((0, b, marriage.GetId(), pair))
+            blocks.append((0, b, int(marriage.GetId()[1:]), pair))
             used.add(p1.GetId())
             used.add(p2.GetId())
 
@@ -399,4 +403,255 @@ def compute_canvas_layout(
         "people": [p.GetId() for p in local_people],
         "marriages": marriage_payload,
         "positions": positions,
+        "cutoff": None if cutoff is None else {"distance": list(cutoff.distance), "truncated": cutoff.truncated},
+    }
+
+
+LAYOUT_MODES = ("canvas", "pedigree", "fan", "descendants")
+
+
+def compute_layout(
+    family_tree,
+    center_id: int,
+    mode: str = "canvas",
+    max_up: int = 2,
+    max_down: int = 2,
+    max_nodes: int = 200,
+    x_spacing: int = 180,
+    y_spacing: int = 140,
+    sweeps: int = 6,
+) -> Dict[str, Any]:
+    """
+    Layout in one of LAYOUT_MODES. pedigree and fan show max_up generations of
+    ancestors, descendants shows max_down generations of descendants; max_nodes and
+    sweeps only apply to the general canvas layout.
+    """
+    if mode == "canvas":
+        return compute_canvas_layout(
+            family_tree, center_id, max_up=max_up, max_down=max_down, max_nodes=max_nodes,
+            x_spacing=x_spacing, y_spacing=y_spacing, sweeps=sweeps,
+        )
+    if mode in ("pedigree", "fan"):
+        return compute_pedigree_layout(
+            family_tree, center_id, generations=max_up, x_spacing=x_spacing, y_spacing=y_spacing, fan=mode == "fan"
+        )
+    if mode == "descendants":
+        return compute_descendant_layout(family_tree, center_id, generations=max_down, x_spacing=x_spacing, y_spacing=y_spacing)
+    raise ValueError(f'Unknown layout mode "{mode}"')
+
+
+def compute_pedigree_layout(
+    family_tree,
+    center_id: int,
+    generations: int = 4,
+    x_spacing: int = 180,
+    y_spacing: int = 140,
+    fan: bool = False,
+    fan_degrees: float = 180.0,
+) -> Dict[str, Any]:
+    """
+    Ancestor chart in one pass: the ancestor in generation k and slot s (0 <= s < 2**k)
+    has their father in slot 2s and mother in slot 2s + 1 of generation k + 1, and
+    every position follows from (k, s) alone. With fan=True the slots are wedges of a
+    fan_degrees arc, father's side on the left, with rings wide enough for each slot.
+
+    An ancestor reached through more than one line (pedigree collapse) is placed once,
+    at their nearest, leftmost slot; the other slots are listed in "references" with
+    the person, the slot position and the child it hangs under, and are not expanded.
+    Marriages only list the children drawn under the placed couple, so a child under
+    a reference is not joined to the far-away placement.
+    """
+    # Loads the links of backends that create relatives on demand; a backend may hand
+    # out a linked copy of the center afterwards, so it is looked up again.
+    for _ in family_tree.iter_ancestors(family_tree.GetPersonFromID(center_id), max_depth=generations):
+        pass
+    center = family_tree.GetPersonFromID(center_id)
+
+    slots = []
+    repeats = []
+    placed = set()
+    q = deque([(center, 0, 0, None)])
+    while q:
+        person, k, s, child = q.popleft()
+        pid = person.GetId()
+        if pid in placed:
+            repeats.append((pid, k, s, child))
+            continue
+        placed.add(pid)
+        slots.append((person, k, s, child))
+        if k < generations:
+            father, mother = _parent_slots(person)
+            if father is not None:
+                q.append((father, k + 1, 2 * s, pid))
+            if mother is not None:
+                q.append((mother, k + 1, 2 * s + 1, pid))
+
+    deepest = max(k for _, k, _, _ in slots + repeats)
+    span = math.radians(fan_degrees)
+    start = (math.pi + span) / 2.0
+
+    def slot_position(k, s):
+        if fan:
+            if k == 0:
+                return (0.0, 0.0)
+            radius = max(k * y_spacing, x_spacing * (2 ** k) / span)
+            angle = start - (s + 0.5) * span / (2 ** k)
+            return (radius * math.cos(angle), -radius * math.sin(angle))
+        width = (2 ** (deepest - k)) * x_spacing
+        return ((s + 0.5) * width - (2 ** deepest) * x_spacing / 2.0, -k * y_spacing)
+
+    positions = {person.GetId(): slot_position(k, s) for person, k, s, _ in slots}
+    links = {(person.GetId(), child) for person, _, _, child in slots if child is not None}
+    references = [
+        {"id": pid, "child": child, "generation": k, "position": list(slot_position(k, s))}
+        for pid, k, s, child in repeats
+    ]
+    return _chart_payload(center_id, [person for person, _, _, _ in slots], positions, links, references)
+
+
+def compute_descendant_layout(
+    family_tree,
+    center_id: int,
+    generations: int = 3,
+    x_spacing: int = 180,
+    y_spacing: int = 140,
+) -> Dict[str, Any]:
+    """
+    Descendant chart in two linear passes: subtree widths bottom-up, then x offsets
+    top-down. Each descendant is drawn next to their spouses (those who are not
+    descendants themselves) and centered over their children, grouped by marriage.
+
+    A descendant reached through a second parent (both parents descend from the
+    center) is placed under the first parent only; under the other they take a
+    one-slot entry in "references".
+    """
+    # One generation further than shown, so on-demand backends also load the
+    # marriages (and spouses) of the last generation.
+    descendant_ids = {center_id}
+    for descendant, distance in family_tree.iter_descendants(
+        family_tree.GetPersonFromID(center_id), max_depth=generations + 1, with_distance=True
+    ):
+        if distance <= generations:
+            descendant_ids.add(descendant.GetId())
+    center = family_tree.GetPersonFromID(center_id)
+
+    # Breadth-first, so each descendant hangs under the parent nearest the center.
+    kids: Dict[int, List[Tuple[str, Any]]] = {}
+    links = set()
+    blocks: Dict[int, List[Any]] = {}
+    depth = {center_id: 0}
+    order = [center]
+    claimed = {center_id}
+    q = deque([center])
+    while q:
+        person = q.popleft()
+        pid = person.GetId()
+        blocks[pid] = [person]
+        kids[pid] = []
+        for marriage in person.Marriages:
+            spouse = marriage.GetSpouse(person)
+            if spouse.GetId() not in descendant_ids and spouse.GetId() not in claimed:
+                claimed.add(spouse.GetId())
+                blocks[pid].append(spouse)
+            if depth[pid] >= generations:
+                continue
+            for child in marriage.Children:
+                cid = child.GetId()
+                if cid in depth:
+                    kids[pid].append(("reference", child))
+                    continue
+                depth[cid] = depth[pid] + 1
+                claimed.add(cid)
+                links.add((pid, cid))
+                kids[pid].append(("person", child))
+                order.append(child)
+                q.append(child)
+
+    # Bottom-up widths: children come after their parent in breadth-first order.
+    width: Dict[int, float] = {}
+    for person in reversed(order):
+        pid = person.GetId()
+        below = sum(width[c.GetId()] if kind == "person" else x_spacing for kind, c in kids[pid])
+        width[pid] = max(len(blocks[pid]) * x_spacing, below)
+
+    positions = {}
+    references = []
+    left = {center_id: -width[center_id] / 2.0}
+    for person in order:
+        pid = person.GetId()
+        y = depth[pid] * y_spacing
+        block = blocks[pid]
+        x = left[pid] + (width[pid] - len(block) * x_spacing) / 2.0 + x_spacing / 2.0
+        for member in block:
+            positions[member.GetId()] = (x, y)
+            x += x_spacing
+        below = sum(width[c.GetId()] if kind == "person" else x_spacing for kind, c in kids[pid])
+        x = left[pid] + (width[pid] - below) / 2.0
+        for kind, child in kids[pid]:
+            if kind == "person":
+                left[child.GetId()] = x
+                x += width[child.GetId()]
+            else:
+                references.append({"id": child.GetId(), "parent": pid, "generation": depth[pid] + 1, "position": [x + x_spacing / 2.0, y + y_spacing]})
+                x += x_spacing
+
+    cx, _ = positions[center_id]
+    positions = {pid: (x - cx, y) for pid, (x, y) in positions.items()}
+    for reference in references:
+        reference["position"][0] -= cx
+    people = [member for person in order for member in blocks[person.GetId()]]
+    return _chart_payload(center_id, people, positions, links, references)
+
+
+def _parent_slots(person) -> Tuple[Optional[Any], Optional[Any]]:
+    """(father's-side parent, mother's-side parent): by gender, else in listed order."""
+    left = right = None
+    unplaced = []
+    seen = set()
+    for parent in person.Parents:
+        if parent.GetId() in seen:
+            continue
+        seen.add(parent.GetId())
+        if parent.Gender == "Male" and left is None:
+            left = parent
+        elif parent.Gender == "Female" and right is None:
+            right = parent
+        else:
+            unplaced.append(parent)
+    for parent in unplaced:
+        if left is None:
+            left = parent
+        elif right is None:
+            right = parent
+    return left, right
+
+
+def _chart_payload(center_id, people, positions, links, references) -> Dict[str, Any]:
+    """
+    Chart result in compute_canvas_layout's format plus "references". links holds the
+    (parent, child) pairs the chart draws; a marriage lists a child only through them.
+    """
+    marriages = {}
+    for person in people:
+        for marriage in person.Marriages:
+            marriages[marriage.GetId()] = marriage
+
+    marriage_payload = []
+    for marriage in sorted(marriages.values(), key=lambda m: int(m.GetId()[1:])):
+        spouses = [marriage.Person1.GetId(), marriage.Person2.GetId()]
+        children = [
+            c.GetId() for c in marriage.Children
+            if (spouses[0], c.GetId()) in links or (spouses[1], c.GetId()) in links
+        ]
+        both = spouses[0] in positions and spouses[1] in positions
+        if both or (children and (spouses[0] in positions or spouses[1] in positions)):
+            marriage_payload.append({"id": marriage.GetId(), "spouses": spouses, "children": children})
+
+    return {
+        "center_id": center_id,
+        "people": [p.GetId() for p in people],
+        "marriages": marriage_payload,
+        "positions": positions,
+        "cutoff": None,
+        "references": references,
     }
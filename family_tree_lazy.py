@@ -0,0 +1,295 @@
+"""
+Lazy family tree loading.
+Builds an on-disk byte-offset index over the People/Marriages JSON files once, then
+creates Person and Marriage objects only when a traversal reaches them.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from FamilyTree import FamilyTree, Marriage, Person
+from family_tree_search import NameIndex
+
+
+INDEX_MAGIC = b"FTLAZY01"
+# magic, people size, people mtime_ns, marriages size, marriages mtime_ns, section counts
+_HEADER = struct.Struct("<8sQqQqQQQ")
+# key (person id), byte offset, byte length, record ordinal
+_ENTRY = struct.Struct("<qQIQ")
+
+_JSON_STRUCTURE = re.compile(rb'[{}\[\]"\\]')
+
+
+def scan_records(data) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (offset, length) for each object in the top-level array of a
+    {"Key": [ {...}, {...} ]} JSON document without parsing it.
+    """
+    depth = 0
+    in_string = False
+    escaped_at = -1
+    start = 0
+    for m in _JSON_STRUCTURE.finditer(data):
+        i = m.start()
+        c = data[i]
+        if in_string:
+            if i == escaped_at:
+                continue
+            if c == 0x5C:  # backslash
+                escaped_at = i + 1
+            elif c == 0x22:  # quote
+                in_string = False
+            continue
+        if c == 0x22:
+            in_string = True
+        elif c == 0x7B or c == 0x5B:  # { [
+            depth += 1
+            if depth == 3 and c == 0x7B:
+                start = i
+        else:
+            if depth == 3 and c == 0x7D:
+                yield start, i + 1 - start
+            depth -= 1
+
+
+def iter_records(path: str) -> Iterator[dict]:
+    """Parse the objects of a {"Key": [ {...}, ... ]} JSON file one at a time."""
+    data = _map_file(path)
+    try:
+        for offset, length in scan_records(data):
+            yield json.loads(data[offset:offset + length])
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+def _map_file(path: str):
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _source_stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def build_index(people_file: str, marriages_file: str, index_file: str):
+    """
+    Write the offset index: people sorted by id, and marriages keyed by spouse id and by child id.
+    """
+    people_data = _map_file(people_file)
+    people_entries = []
+    for ordinal, (offset, length) in enumerate(scan_records(people_data)):
+        record = json.loads(people_data[offset:offset + length])
+        people_entries.append((record["ID"], offset, length, ordinal))
+    people_entries.sort()
+
+    marriages_data = _map_file(marriages_file)
+    spouse_entries = []
+    child_entries = []
+    for ordinal, (offset, length) in enumerate(scan_records(marriages_data)):
+        record = json.loads(marriages_data[offset:offset + length])
+        spouse_entries.append((record["Person1"], offset, length, ordinal))
+        spouse_entries.append((record["Person2"], offset, length, ordinal))
+        for child in record["Children"]:
+            child_entries.append((child, offset, length, ordinal))
+    spouse_entries.sort()
+    child_entries.sort()
+
+    tmp_file = index_file + ".tmp"
+    with open(tmp_file, "wb") as file:
+        file.write(_HEADER.pack(
+            INDEX_MAGIC,
+            *_source_stamp(people_file),
+            *_source_stamp(marriages_file),
+            len(people_entries),
+            len(spouse_entries),
+            len(child_entries),
+        ))
+        for entries in (people_entries, spouse_entries, child_entries):
+            for entry in entries:
+                file.write(_ENTRY.pack(*entry))
+    os.replace(tmp_file, index_file)
+
+
+class _IndexSection():
+    """A sorted run of fixed-size entries inside the memory-mapped index, searched by key."""
+
+    def __init__(self, data, start: int, count: int):
+        self.data = data
+        self.start = start
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        # Key only, so bisect can search the section directly.
+        return _ENTRY.unpack_from(self.data, self.start + i * _ENTRY.size)[0]
+
+    def Lookup(self, key) -> List[Tuple[int, int, int]]:
+        i = bisect.bisect_left(self, key)
+        found = []
+        while i < self.count:
+            entry_key, offset, length, ordinal = _ENTRY.unpack_from(self.data, self.start + i * _ENTRY.size)
+            if entry_key != key:
+                break
+            found.append((offset, length, ordinal))
+            i += 1
+        return found
+
+
+class LazyFamilyTree(FamilyTree):
+    """
+    FamilyTree that reads people and marriages from disk only as traversal reaches them.
+
+    Startup opens (or builds, when missing or stale) the offset index and does no other
+    work. Person.Generation is left as None; compute_canvas_layout assigns generations
+    relative to the center. Operations over the whole tree (people, marriages,
+    FindDuplicates, GetStatistics and so write_gedcom) raise NotImplementedError rather
+    than answer from the part loaded so far; load the files with FamilyTree for those.
+    """
+
+    def __init__(self, people_file, marraiges_file, index_file: Optional[str] = None):
+        self.people_file = people_file
+        self.marriages_file = marraiges_file
+        self.index_file = index_file or people_file + ".idx"
+        self._OpenIndex()
+        self._people_data = _map_file(people_file)
+        self._marriages_data = _map_file(marraiges_file)
+
+        self.generations = None
+        self.validation_report = None
+        self._people_by_id = {}
+        self._marriages_by_ordinal: Dict[int, Marriage] = {}
+        self._expanded = set()
+        self._name_index = None
+
+    def _OpenIndex(self):
+        if not self._IndexIsCurrent():
+            build_index(self.people_file, self.marriages_file, self.index_file)
+        self._index_data = _map_file(self.index_file)
+        header = _HEADER.unpack_from(self._index_data, 0)
+        n_people, n_spouse, n_child = header[5:8]
+        start = _HEADER.size
+        self._people_index = _IndexSection(self._index_data, start, n_people)
+        start += n_people * _ENTRY.size
+        self._spouse_index = _IndexSection(self._index_data, start, n_spouse)
+        start += n_spouse * _ENTRY.size
+        self._child_index = _IndexSection(self._index_data, start, n_child)
+
+    def _IndexIsCurrent(self) -> bool:
+        try:
+            with open(self.index_file, "rb") as file:
+                header = file.read(_HEADER.size)
+        except FileNotFoundError:
+            return False
+        if len(header) != _HEADER.size:
+            return False
+        magic, p_size, p_mtime, m_size, m_mtime = _HEADER.unpack(header)[:5]
+        return (
+            magic == INDEX_MAGIC
+            and (p_size, p_mtime) == _source_stamp(self.people_file)
+            and (m_size, m_mtime) == _source_stamp(self.marriages_file)
+        )
+
+    @property
+    def people(self):
+        raise self._WholeTreeError("people")
+
+    @property
+    def marriages(self):
+        raise self._WholeTreeError("marriages")
+
+    def FindDuplicates(self, min_score=0.75, max_block_size=50, window=10, workers=None):
+        raise self._WholeTreeError("FindDuplicates")
+
+    def GetStatistics(self):
+        raise self._WholeTreeError("GetStatistics")
+
+    def _WholeTreeError(self, what):
+        return NotImplementedError(
+            f'{what} needs the whole tree, but a LazyFamilyTree only loads what traversal reaches; '
+            f'use FamilyTree("{self.people_file}", "{self.marriages_file}")'
+        )
+
+    def GetPersonFromID(self, id):
+        person = self._people_by_id.get(id)
+        if person is not None:
+            return person
+        found = self._people_index.Lookup(id)
+        assert(len(found) == 1)
+        offset, length, _ = found[0]
+        person = Person.FromRecord(json.loads(self._people_data[offset:offset + length]))
+        self._people_by_id[id] = person
+        return person
+
+    def _Expand(self, person):
+        pid = person.GetId()
+        if pid in self._expanded:
+            return
+        child_of = [entry[2] for entry in self._child_index.Lookup(pid)]
+        for offset, length, ordinal in self._spouse_index.Lookup(pid) + self._child_index.Lookup(pid):
+            if ordinal in self._marriages_by_ordinal:
+                continue
+            record = json.loads(self._marriages_data[offset:offset + length])
+            marriage = Marriage(
+                self.GetPersonFromID(record["Person1"]),
+                self.GetPersonFromID(record["Person2"]),
+                [self.GetPersonFromID(c) for c in record["Children"]],
+            )
+            marriage.id = "m" + str(ordinal)
+            self._marriages_by_ordinal[ordinal] = marriage
+        self._Relink(person, child_of)
+        self._expanded.add(pid)
+
+    def _Relink(self, person, child_of: List[int]):
+        # Marriages were created in the order traversal reached them; every marriage
+        # of person is loaded now, so rebuild its links in file order as FamilyTree has them.
+        person.Marriages.sort(key=lambda m: int(m.GetId()[1:]))
+        person.Spouses = []
+        person.Children = []
+        for marriage in person.Marriages:
+            for side, spouse in ((marriage.Person1, marriage.Person2), (marriage.Person2, marriage.Person1)):
+                if side is person:
+                    person.Spouses.append(spouse)
+            for child in marriage.Children:
+                for side in (marriage.Person1, marriage.Person2):
+                    if side is person:
+                        person.Children.append(child)
+        person.Parents = []
+        for ordinal in sorted(set(child_of)):
+            marriage = self._marriages_by_ordinal[ordinal]
+            for child in marriage.Children:
+                if child is person:
+                    person.Parents += [marriage.Person1, marriage.Person2]
+
+    def GetLocalNeighbourhood(self, center_id, max_up=2, max_down=2, max_nodes=200):
+        local_people, cutoff = super().GetLocalNeighbourhood(center_id, max_up=max_up, max_down=max_down, max_nodes=max_nodes)
+        # People on the edge of the neighbourhood were never expanded; expand them so
+        # links between any two local people exist for the layout.
+        for person in local_people:
+            self._Expand(person)
+        return local_people, cutoff
+
+    def _AdjacencyTable(self):
+        # Only the materialised part of the tree is known, so batch extraction stays
+        # in-process where neighbours can be loaded on demand.
+        return None
+
+    def GetNameIndex(self):
+        # Searching needs every name, so this is the one place that reads the whole
+        # people file; the records are parsed one at a time and not kept.
+        if self._name_index is None:
+            index = NameIndex()
+            for offset, length in scan_records(self._people_data):
+                index.Add(Person.FromRecord(json.loads(self._people_data[offset:offset + length])))
+            self._name_index = index
+        return self._name_index
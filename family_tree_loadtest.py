@@ -0,0 +1,106 @@
+"""
+Load test for family_tree_server.
+Opens keep-alive connections to a running layout server on localhost and reports
+throughput, latency percentiles and response codes.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List
+
+
+def _parse_centers(text: str) -> List[int]:
+    centers = []
+    for part in text.split(","):
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            centers.extend(range(int(lo), int(hi) + 1))
+        elif part:
+            centers.append(int(part))
+    return centers
+
+
+async def _request(reader, writer, host, path, etag=None):
+    lines = [f'GET {path} HTTP/1.1', f'Host: {host}']
+    if etag:
+        lines.append(f'If-None-Match: {etag}')
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get("content-length", "0")))
+    return status, headers.get("etag")
+
+
+async def _client(host, port, centers, requests, use_etags, latencies, statuses, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+    etags: Dict[int, str] = {}
+    try:
+        for _ in range(requests):
+            center = rng.choice(centers)
+            start = time.perf_counter()
+            status, etag = await _request(reader, writer, host, f'/layout?center={center}', etags.get(center) if use_etags else None)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            if etag:
+                etags[center] = etag
+    finally:
+        writer.close()
+
+
+async def run(host="127.0.0.1", port=8765, centers=(0,), connections=16, requests=100, use_etags=False, seed=0):
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, list(centers), requests, use_etags, latencies, statuses, random.Random(seed + i))
+        for i in range(connections)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000.0
+
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": latencies[-1] * 1000.0 if latencies else 0.0,
+        "statuses": statuses,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test a local family_tree_server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--centers", default="0-12", help="center ids, e.g. 0-12 or 1,5,9")
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=100, help="requests per connection")
+    parser.add_argument("--etags", action="store_true", help="send If-None-Match for layouts already seen")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(
+        args.host, args.port, _parse_centers(args.centers), args.connections, args.requests, args.etags
+    ))
+    print(f'{result["requests"]} requests in {result["seconds"]:.2f}s ({result["rps"]:.0f} req/s)')
+    print(f'latency p50 {result["p50_ms"]:.1f} ms, p95 {result["p95_ms"]:.1f} ms, p99 {result["p99_ms"]:.1f} ms, max {result["max_ms"]:.1f} ms')
+    print("status codes:", ", ".join(f'{code}: {count}' for code, count in sorted(result["statuses"].items())))
+
+
+if __name__ == "__main__":
+    main()
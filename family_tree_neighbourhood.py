@@ -0,0 +1,206 @@
+"""
+Local neighbourhood selection.
+Works on person ids through a neighbour lookup, so the same selection serves
+FamilyTree.GetLocalPeople, lazily loaded trees, and batch extraction for many centers
+with memoised lookups or a pool of worker processes.
+"""
+
+import heapq
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+
+# pid -> (spouse ids, parent ids, child ids)
+Neighbours = Tuple[Sequence[int], Sequence[int], Sequence[int]]
+
+
+class Cutoff(NamedTuple):
+    """
+    Where a neighbourhood was truncated by max_nodes: the distance of the closest person
+    left out, and the included people who have relatives within the step limits that
+    were left out.
+    """
+    distance: Tuple[int, int]
+    truncated: List[int]
+
+
+def select_local_neighbourhood(
+    center_id: int,
+    neighbours: Callable[[int], Neighbours],
+    max_up: int = 2,
+    max_down: int = 2,
+    max_nodes: int = 200,
+) -> Tuple[List[int], Optional[Cutoff]]:
+    """
+    Closest-first walk from the center over everyone reachable by some path with at
+    most max_up parent steps and max_down child steps. Relationship distance is
+    (links, generational steps): the number of spouse/parent/child links walked, ties
+    going to fewer parent/child steps and then to the lower id.
+
+    Each person is included once, at their smallest distance, but is walked on again
+    from any later path that leaves a budget no path so far has left (fewer parent
+    steps or fewer child steps used), so a short path cannot hide relatives that only
+    a longer one reaches. A person keeps at most min(max_up, max_down) + 1 such
+    (up, down) states, so k included people cost O(k log k) for bounded family sizes
+    and step limits.
+
+    Returns the included ids, closest first, and a Cutoff when max_nodes stopped the
+    walk before every reachable person was included (None otherwise).
+    """
+    included: Dict[int, None] = {}  # insertion-ordered set
+    # pid -> (up_used, down_used, links, steps) states walked from; no state's
+    # (up_used, down_used) is at or below another's in both
+    walked: Dict[int, List[Tuple[int, int, int, int]]] = {}
+    # pid -> the queued entry with the smallest distance; a new entry no closer and
+    # with no more budget left would only be popped later and skipped, so is not pushed
+    queued = {center_id: (0, 0, center_id, 0, 0)}
+    heap = [(0, 0, center_id, 0, 0)]
+
+    while heap:
+        links, steps, pid, up_used, down_used = heapq.heappop(heap)
+        states = walked.setdefault(pid, [])
+        if _dominated(states, up_used, down_used):
+            continue
+        if pid not in included:
+            if len(included) >= max_nodes:
+                heapq.heappush(heap, (links, steps, pid, up_used, down_used))
+                break
+            included[pid] = None
+        states[:] = [state for state in states if not (up_used <= state[0] and down_used <= state[1])]
+        states.append((up_used, down_used, links, steps))
+        for rid, du, dd in _admissible(neighbours(pid), up_used, down_used, max_up, max_down):
+            entry = (links + 1, steps + du + dd, rid, up_used + du, down_used + dd)
+            prev = queued.get(rid)
+            if prev is not None and prev[:2] <= entry[:2] and prev[3] <= entry[3] and prev[4] <= entry[4]:
+                continue
+            if _dominated(walked.get(rid, ()), entry[3], entry[4]):
+                continue
+            if prev is None or entry < prev:
+                queued[rid] = entry
+            heapq.heappush(heap, entry)
+
+    if not heap:
+        return list(included), None
+
+    # The budget ran out: anyone admissible from an included person's states, walked or
+    # still queued, who is not included was left out.
+    distance = None
+    truncated = set()
+    pending = {pid: [] for pid in included}
+    for links, steps, pid, up_used, down_used in heap:
+        if pid in pending:
+            pending[pid].append((up_used, down_used, links, steps))
+    for pid in included:
+        for up_used, down_used, links, steps in walked.get(pid, []) + pending[pid]:
+            for rid, du, dd in _admissible(neighbours(pid), up_used, down_used, max_up, max_down):
+                if rid not in included:
+                    truncated.add(pid)
+                    nearest = (links + 1, steps + du + dd)
+                    distance = nearest if distance is None else min(distance, nearest)
+    if distance is None:
+        return list(included), None
+    return list(included), Cutoff(distance, [pid for pid in included if pid in truncated])
+
+
+def _dominated(states: Iterable[Tuple[int, ...]], up_used: int, down_used: int) -> bool:
+    return any(state[0] <= up_used and state[1] <= down_used for state in states)
+
+
+def _admissible(relatives: Neighbours, up_used: int, down_used: int, max_up: int, max_down: int):
+    spouses, parents, children = relatives
+    for rid in spouses:
+        yield rid, 0, 0
+    if up_used < max_up:
+        for rid in parents:
+            yield rid, 1, 0
+    if down_used < max_down:
+        for rid in children:
+            yield rid, 0, 1
+
+
+def select_local_ids(
+    center_id: int,
+    neighbours: Callable[[int], Neighbours],
+    max_up: int = 2,
+    max_down: int = 2,
+    max_nodes: int = 200,
+) -> List[int]:
+    """Included ids of select_local_neighbourhood, closest first."""
+    return select_local_neighbourhood(center_id, neighbours, max_up, max_down, max_nodes)[0]
+
+
+class SharedNeighbours():
+    """
+    Memoised neighbour lookup shared by every center in a batch, so each person's links
+    are read (and, for lazy trees, loaded) once however many neighbourhoods they fall in.
+    """
+
+    def __init__(self, lookup: Callable[[int], Neighbours]):
+        self.lookup = lookup
+        self.table: Dict[int, Neighbours] = {}
+
+    def __call__(self, pid: int) -> Neighbours:
+        found = self.table.get(pid)
+        if found is None:
+            found = self.lookup(pid)
+            self.table[pid] = found
+        return found
+
+
+_WORKER_ADJACENCY: Dict[int, Neighbours] = {}
+
+
+def _init_worker(adjacency: Dict[int, Neighbours]):
+    global _WORKER_ADJACENCY
+    _WORKER_ADJACENCY = adjacency
+
+
+def _select_chunk(center_ids: List[int], max_up: int, max_down: int, max_nodes: int) -> List[List[int]]:
+    lookup = _WORKER_ADJACENCY.__getitem__
+    return [select_local_ids(c, lookup, max_up, max_down, max_nodes) for c in center_ids]
+
+
+def select_local_ids_batch(
+    center_ids: Iterable[int],
+    neighbours: Callable[[int], Neighbours],
+    max_up: int = 2,
+    max_down: int = 2,
+    max_nodes: int = 200,
+    workers: Optional[int] = None,
+    adjacency: Union[Dict[int, Neighbours], Callable[[], Optional[Dict[int, Neighbours]]], None] = None,
+    chunk_size: int = 256,
+    min_pool_centers: int = 256,
+) -> Dict[int, List[int]]:
+    """
+    select_local_ids for many centers. Repeated centers are computed once and neighbour
+    lookups are memoised across the batch; each center is still walked on its own, so
+    in-process the saving is only the lookups (worthwhile when they load from disk).
+
+    With workers > 1 and more than min_pool_centers distinct centers, chunk_size centers
+    at a time are selected on a process pool; smaller batches run in-process, where
+    starting the pool would cost more than it saves. adjacency (the full id -> neighbours
+    table) must then be given, since each worker receives it once at startup. It may
+    also be a function building the table, called only when the pool is used; if it
+    returns None the batch runs in-process.
+    """
+    unique = list(dict.fromkeys(center_ids))
+    use_pool = workers is not None and workers > 1 and len(unique) > min_pool_centers
+    if use_pool and callable(adjacency):
+        adjacency = adjacency()
+        use_pool = adjacency is not None
+    if use_pool:
+        if adjacency is None:
+            raise ValueError("adjacency is required when workers > 1")
+        # Imported here: the process pool machinery costs more to import than a
+        # single neighbourhood takes to select.
+        from concurrent.futures import ProcessPoolExecutor
+
+        chunks = [unique[i:i + chunk_size] for i in range(0, len(unique), chunk_size)]
+        results: Dict[int, List[int]] = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(adjacency,)) as pool:
+            futures = [pool.submit(_select_chunk, chunk, max_up, max_down, max_nodes) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                results.update(zip(chunk, future.result()))
+        return results
+
+    shared = neighbours if isinstance(neighbours, SharedNeighbours) else SharedNeighbours(neighbours)
+    return {c: select_local_ids(c, shared, max_up, max_down, max_nodes) for c in unique}
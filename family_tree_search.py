@@ -0,0 +1,246 @@
+"""
+Name search index.
+Indexes the FirstName, MiddleNames, LastName and MaidenName tokens of people in a prefix
+trie, with Soundex keys and single-edit deletion keys for phonetic and typo-tolerant lookup.
+"""
+
+import heapq
+import re
+import unicodedata
+from typing import Dict, Iterable, Iterator, List, Set
+
+
+EXACT_SCORE = 4
+PREFIX_SCORE = 3
+PHONETIC_SCORE = 2
+FUZZY_SCORE = 1
+
+_TOKEN_SPLIT = re.compile(r"[^a-z0-9]+")
+_SOUNDEX_CODES = {}
+for _letters, _digit in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"), ("l", "4"), ("mn", "5"), ("r", "6")):
+    for _letter in _letters:
+        _SOUNDEX_CODES[_letter] = _digit
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Lowercase, strip accents and split a name into alphanumeric tokens."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return [t for t in _TOKEN_SPLIT.split(text) if t]
+
+
+def soundex(token: str) -> str:
+    """American Soundex code of a normalized token, e.g. "robert" -> "R163"."""
+    letters = [c for c in token if c.isalpha()]
+    if not letters:
+        return token
+    code = letters[0].upper()
+    last = _SOUNDEX_CODES.get(letters[0], "")
+    for c in letters[1:]:
+        digit = _SOUNDEX_CODES.get(c, "")
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        if c not in "hw":
+            last = digit
+    return code.ljust(4, "0")
+
+
+def fuzzy_keys(token: str) -> Set[str]:
+    """The token and every single-character deletion of it; tokens one edit apart share one."""
+    return {token[:i] + token[i + 1:] for i in range(len(token))} | {token}
+
+
+def person_name_tokens(person) -> Set[str]:
+    tokens = set(normalize_tokens(person.FirstName))
+    for name in person.MiddleNames:
+        tokens.update(normalize_tokens(name))
+    tokens.update(normalize_tokens(person.LastName))
+    tokens.update(normalize_tokens(person.MaidenName))
+    return tokens
+
+
+class _TrieNode():
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.ids: Set = set()
+
+
+class NameMatcher():
+    """
+    Query parsing and ranking shared by the name index storages. Subclasses look up
+    indexed tokens: _Prefixed (tokens starting with a prefix, itself included),
+    _Phonetic (tokens with a Soundex code), _Fuzzy (tokens with a deletion key) and
+    _Ids (the people with a token).
+    """
+
+    def _TokenMatches(self, token) -> Dict[str, int]:
+        """
+        Indexed tokens matching one query token, with their score: the token itself,
+        longer tokens with it as a prefix, the same Soundex code, or one edit away.
+        Phonetic and edit matching only apply to alphabetic tokens.
+        """
+        matches: Dict[str, int] = {}
+        for candidate in self._Prefixed(token):
+            matches[candidate] = EXACT_SCORE if candidate == token else PREFIX_SCORE
+
+        if token.isalpha():
+            for candidate in self._Phonetic(soundex(token)):
+                matches.setdefault(candidate, PHONETIC_SCORE)
+            for key in fuzzy_keys(token):
+                for candidate in self._Fuzzy(key):
+                    matches.setdefault(candidate, FUZZY_SCORE)
+        return matches
+
+    def Search(self, query: str, limit: int = 20) -> List:
+        """
+        Ids of the best matching people. Every query token must match one of the person's
+        name tokens. People are ranked by total match score, then by id; single-token
+        queries also prefer matched tokens closer in length to the query.
+        """
+        tokens = normalize_tokens(query)
+        if not tokens or limit <= 0:
+            return []
+        per_token = [self._TokenMatches(t) for t in tokens]
+
+        if len(per_token) == 1:
+            # Walk matched tokens best first and stop once the limit is filled, so a
+            # one-letter prefix does not gather every id below it.
+            groups: Dict = {}
+            for candidate, score in per_token[0].items():
+                groups.setdefault((-score, len(candidate)), []).append(candidate)
+            results = []
+            seen = set()
+            for key in sorted(groups):
+                ids = set()
+                for candidate in groups[key]:
+                    ids |= self._Ids(candidate)
+                ids -= seen
+                results.extend(heapq.nsmallest(limit - len(results), ids))
+                seen |= ids
+                if len(results) >= limit:
+                    break
+            return results
+
+        # Bucket people by total score with set intersections, one query token at a
+        # time; a person scores each token by their best matching name token.
+        totals: Dict[int, Set] = {0: None}
+        for matches in per_token:
+            tiers: Dict[int, Set] = {}
+            for candidate, score in matches.items():
+                tiers.setdefault(score, set()).update(self._Ids(candidate))
+            assigned: Set = set()
+            next_totals: Dict[int, Set] = {}
+            for score in sorted(tiers, reverse=True):
+                ids = tiers[score] - assigned
+                assigned |= ids
+                for total, bucket in totals.items():
+                    hit = ids if bucket is None else ids & bucket
+                    if hit:
+                        next_totals.setdefault(total + score, set()).update(hit)
+            totals = next_totals
+            if not totals:
+                return []
+
+        results = []
+        for total in sorted(totals, reverse=True):
+            results.extend(heapq.nsmallest(limit - len(results), totals[total]))
+            if len(results) >= limit:
+                break
+        return results
+
+
+class NameIndex(NameMatcher):
+    """
+    Incrementally maintained name index. People are identified by their id; Add, Remove
+    and Update touch only the tokens of the person concerned.
+    """
+
+    def __init__(self, people: Iterable = ()):
+        self._root = _TrieNode()
+        self._tokens_by_id: Dict = {}
+        self._phonetic: Dict[str, Set[str]] = {}
+        self._fuzzy: Dict[str, Set[str]] = {}
+        for person in people:
+            self.Add(person)
+
+    def __len__(self):
+        return len(self._tokens_by_id)
+
+    def Add(self, person):
+        pid = person.GetId()
+        if pid in self._tokens_by_id:
+            self.Remove(pid)
+        tokens = person_name_tokens(person)
+        self._tokens_by_id[pid] = tokens
+        for token in tokens:
+            node = self._root
+            for c in token:
+                node = node.children.setdefault(c, _TrieNode())
+            if not node.ids:
+                self._phonetic.setdefault(soundex(token), set()).add(token)
+                for key in fuzzy_keys(token):
+                    self._fuzzy.setdefault(key, set()).add(token)
+            node.ids.add(pid)
+
+    def Remove(self, pid):
+        tokens = self._tokens_by_id.pop(pid, ())
+        for token in tokens:
+            path = [self._root]
+            for c in token:
+                path.append(path[-1].children[c])
+            node = path[-1]
+            node.ids.discard(pid)
+            if node.ids:
+                continue
+            # Last person with this token: drop its keys and prune empty trie branches.
+            self._DiscardKey(self._phonetic, soundex(token), token)
+            for key in fuzzy_keys(token):
+                self._DiscardKey(self._fuzzy, key, token)
+            for depth in range(len(token), 0, -1):
+                child = path[depth]
+                if child.ids or child.children:
+                    break
+                del path[depth - 1].children[token[depth - 1]]
+
+    def Update(self, person):
+        self.Add(person)
+
+    @staticmethod
+    def _DiscardKey(index, key, token):
+        tokens = index.get(key)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del index[key]
+
+    def _Node(self, prefix):
+        node = self._root
+        for c in prefix:
+            node = node.children.get(c)
+            if node is None:
+                return None
+        return node
+
+    def _Prefixed(self, token) -> Iterator[str]:
+        node = self._Node(token)
+        if node is None:
+            return
+        stack = [(token, node)]
+        while stack:
+            prefix, node = stack.pop()
+            if node.ids:
+                yield prefix
+            stack.extend((prefix + c, child) for c, child in node.children.items())
+
+    def _Phonetic(self, code) -> Iterable[str]:
+        return self._phonetic.get(code, ())
+
+    def _Fuzzy(self, key) -> Iterable[str]:
+        return self._fuzzy.get(key, ())
+
+    def _Ids(self, token) -> Set:
+        return self._Node(token).ids
@@ -0,0 +1,273 @@
+"""
+Local layout server.
+Loads the family tree once and serves compute_canvas_layout results as JSON over HTTP,
+computing layouts on a thread pool (or, optionally, a process pool) with request
+coalescing, a shared LRU cache and ETag/If-None-Match support.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from FamilyTree import FamilyTree
+from family_tree_layout import compute_canvas_layout
+
+
+# Layout parameters accepted in the query string, with their defaults.
+LAYOUT_PARAMS = OrderedDict([
+    ("max_up", 2),
+    ("max_down", 2),
+    ("max_nodes", 200),
+    ("x_spacing", 180),
+    ("y_spacing", 140),
+    ("sweeps", 6),
+])
+MAX_HEADER_BYTES = 16 * 1024
+# Request bodies are never used; a keep-alive connection reads and discards up to this
+# much so the next request starts in the right place, and larger ones close it.
+MAX_DISCARD_BYTES = 64 * 1024
+
+_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 414: "URI Too Long", 431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+
+# The tree used by layout jobs: loaded once per worker process, or shared by all threads.
+_WORKER_TREE = None
+
+
+def _init_worker(people_file: str, marriages_file: str):
+    global _WORKER_TREE
+    _WORKER_TREE = FamilyTree(people_file, marriages_file)
+
+
+def layout_body(key: Tuple[int, ...]) -> Optional[bytes]:
+    """Compute one layout and serialize it; None when the center is not in the tree."""
+    center_id = key[0]
+    params = dict(zip(LAYOUT_PARAMS, key[1:]))
+    try:
+        _WORKER_TREE.GetPersonFromID(center_id)
+    except AssertionError:
+        return None
+    layout = compute_canvas_layout(_WORKER_TREE, center_id, **params)
+    layout["positions"] = {str(pid): [x, y] for pid, (x, y) in layout["positions"].items()}
+    return json.dumps(layout, separators=(",", ":")).encode("utf-8")
+
+
+class LayoutServer():
+    """
+    executor "thread" shares one loaded tree between all worker threads. "process"
+    sidesteps the GIL for layout-heavy loads, but every worker process loads its own
+    full copy of the tree, so memory grows with the worker count (os.cpu_count()
+    processes when workers is None).
+    """
+
+    def __init__(
+        self,
+        people_file: str,
+        marriages_file: str,
+        executor: str = "thread",
+        workers: Optional[int] = None,
+        cache_size: int = 1024,
+    ):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[int, ...], Tuple[str, bytes]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[int, ...], asyncio.Future] = {}
+        self.stats = {"requests": 0, "computed": 0, "cache_hits": 0, "coalesced": 0, "not_modified": 0}
+
+        if executor == "process":
+            self.executor: Executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(people_file, marriages_file)
+            )
+        elif executor == "thread":
+            _init_worker(people_file, marriages_file)
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+        else:
+            raise ValueError(f'Unknown executor "{executor}"')
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def GetLayout(self, key: Tuple[int, ...]) -> Optional[Tuple[str, bytes]]:
+        """(etag, body) for a layout key, from the cache, a matching in-flight job, or a new job."""
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return cached
+
+        # The job runs as its own task so a client hanging up does not cancel it for
+        # the other requests waiting on the same key.
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._Compute(key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def _Compute(self, key: Tuple[int, ...]) -> Optional[Tuple[str, bytes]]:
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(self.executor, layout_body, key)
+        self.stats["computed"] += 1
+        if body is None:
+            return None
+        result = ('"' + hashlib.sha1(body).hexdigest()[:20] + '"', body)
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _ParseKey(query: str) -> Tuple[int, ...]:
+        args = parse_qs(query)
+        if "center" not in args:
+            raise ValueError("missing center")
+        key = [int(args["center"][0])]
+        for name, default in LAYOUT_PARAMS.items():
+            value = int(args[name][0]) if name in args else default
+            if value < 0:
+                raise ValueError(f'{name} must not be negative')
+            key.append(value)
+        return tuple(key)
+
+    async def _Respond(self, path: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        url = urlsplit(path)
+        if url.path == "/health":
+            return 200, {"Content-Type": "application/json"}, json.dumps(self.stats).encode("utf-8")
+        if url.path != "/layout":
+            return 404, {}, b""
+        try:
+            key = self._ParseKey(url.query)
+        except ValueError as e:
+            return 400, {"Content-Type": "text/plain; charset=utf-8"}, str(e).encode("utf-8")
+
+        result = await self.GetLayout(key)
+        if result is None:
+            return 404, {"Content-Type": "text/plain; charset=utf-8"}, b"unknown center"
+        etag, body = result
+        response_headers = {"ETag": etag, "Cache-Control": "no-cache", "Content-Type": "application/json"}
+        if etag in (tag.strip() for tag in headers.get("if-none-match", "").split(",")):
+            self.stats["not_modified"] += 1
+            return 304, response_headers, b""
+        return 200, response_headers, body
+
+    async def HandleConnection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                except ValueError:
+                    # Longer than the StreamReader limit.
+                    await self._Write(writer, 414, {}, b"", keep_alive=False)
+                    break
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._Write(writer, 400, {}, b"", keep_alive=False)
+                    break
+                headers = await self._ReadHeaders(reader)
+                if headers is None:
+                    await self._Write(writer, 431, {}, b"", keep_alive=False)
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+                keep_alive = await self._DiscardBody(reader, headers) and keep_alive
+
+                self.stats["requests"] += 1
+                if method not in ("GET", "HEAD"):
+                    status, response_headers, body = 405, {"Allow": "GET, HEAD"}, b""
+                else:
+                    try:
+                        status, response_headers, body = await self._Respond(path, headers)
+                    except Exception:
+                        status, response_headers, body = 500, {}, b""
+                await self._Write(writer, status, response_headers, b"" if method == "HEAD" else body, keep_alive, len(body))
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _ReadHeaders(reader: asyncio.StreamReader) -> Optional[Dict[str, str]]:
+        """The request headers, or None when they exceed MAX_HEADER_BYTES."""
+        headers = {}
+        size = 0
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                return None
+            size += len(line)
+            if size > MAX_HEADER_BYTES:
+                return None
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    @staticmethod
+    async def _DiscardBody(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bool:
+        """Read past a request body; False when the connection cannot be reused after it."""
+        if "transfer-encoding" in headers:
+            return False
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            return False
+        if length < 0 or length > MAX_DISCARD_BYTES:
+            return False
+        if length:
+            await reader.readexactly(length)
+        return True
+
+    @staticmethod
+    async def _Write(writer, status, headers, body, keep_alive, content_length=None):
+        lines = [f'HTTP/1.1 {status} {_REASONS.get(status, "")}']
+        headers = dict(headers)
+        headers["Content-Length"] = str(len(body) if content_length is None else content_length)
+        headers["Connection"] = "keep-alive" if keep_alive else "close"
+        headers["Access-Control-Allow-Origin"] = "*"
+        headers["Access-Control-Expose-Headers"] = "ETag"
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def Serve(self, host: str = "127.0.0.1", port: int = 8765):
+        server = await asyncio.start_server(self.HandleConnection, host, port)
+        print(f'Serving layouts on http://{host}:{port}/layout?center=<id>')
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve family tree layouts as JSON over HTTP.")
+    parser.add_argument("--people", default="data/example_people.json")
+    parser.add_argument("--marriages", default="data/example_marriages.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--executor", choices=("thread", "process"), default="thread",
+        help="process runs layouts without the GIL but loads a copy of the tree in every worker",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-size", type=int, default=1024)
+    args = parser.parse_args(argv)
+
+    server = LayoutServer(args.people, args.marriages, executor=args.executor, workers=args.workers, cache_size=args.cache_size)
+    try:
+        asyncio.run(server.Serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+"""
+SQLite-backed family tree storage.
+Keeps people, marriages and children in indexed tables and materialises only the
+local subgraph that the layout engine asks for.
+"""
+
+import json
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Set
+
+from FamilyTree import Marriage, Person, select_local_marriages
+from family_tree_lazy import iter_records
+from family_tree_neighbourhood import select_local_neighbourhood
+from family_tree_search import NameMatcher, fuzzy_keys, person_name_tokens, soundex
+from family_tree_validation import FamilyTreeValidationError, ValidationReport, ancestry_cycle_issue, ancestry_cycles, self_marriage_issue, too_many_parents_issue
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS people (
+    id INTEGER PRIMARY KEY,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL DEFAULT '',
+    middle_names TEXT NOT NULL DEFAULT '[]',
+    maiden_name TEXT NOT NULL DEFAULT '',
+    suffix TEXT NOT NULL DEFAULT '',
+    birth_date TEXT,
+    death_date TEXT,
+    gender TEXT
+);
+CREATE TABLE IF NOT EXISTS marriages (
+    id INTEGER PRIMARY KEY,
+    person1 INTEGER NOT NULL REFERENCES people(id),
+    person2 INTEGER NOT NULL REFERENCES people(id),
+    status TEXT,
+    date TEXT
+);
+CREATE INDEX IF NOT EXISTS marriages_person1 ON marriages(person1);
+CREATE INDEX IF NOT EXISTS marriages_person2 ON marriages(person2);
+CREATE TABLE IF NOT EXISTS children (
+    marriage_id INTEGER NOT NULL REFERENCES marriages(id),
+    position INTEGER NOT NULL,
+    child_id INTEGER NOT NULL REFERENCES people(id),
+    PRIMARY KEY (marriage_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS children_child ON children(child_id);
+-- Denormalised one-step moves used by the recursive queries:
+-- spouse (0, 0), parent (1, 0) and child (0, 1).
+CREATE TABLE IF NOT EXISTS relations (
+    person_id INTEGER NOT NULL,
+    relative_id INTEGER NOT NULL,
+    up INTEGER NOT NULL,
+    down INTEGER NOT NULL,
+    PRIMARY KEY (person_id, up, down, relative_id)
+) WITHOUT ROWID;
+-- Name search (see SqliteNameIndex): the normalized name tokens of each person, and
+-- each distinct token under its lookup keys: kind 0 is the token itself, for prefix
+-- ranges, 1 its Soundex code and 2 its fuzzy_keys.
+CREATE TABLE IF NOT EXISTS name_tokens (
+    token TEXT NOT NULL,
+    person_id INTEGER NOT NULL,
+    PRIMARY KEY (token, person_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS name_keys (
+    kind INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    token TEXT NOT NULL,
+    PRIMARY KEY (kind, key, token)
+) WITHOUT ROWID;
+"""
+
+_PERSON_COLUMNS = "id, first_name, last_name, middle_names, maiden_name, suffix, birth_date, death_date, gender"
+
+
+def _person_from_row(row) -> Person:
+    person = Person(row[1], row[8], row[0])
+    person.LastName = row[2]
+    person.MiddleNames = json.loads(row[3])
+    person.MaidenName = row[4]
+    person.Suffix = row[5]
+    person.BirthDate = row[6]
+    person.DeathDate = row[7]
+    return person
+
+
+def _id_list(ids: Iterable[int]) -> str:
+    # Id sets go to SQLite as one JSON array read with json_each, so queries need no
+    # temp tables and a read never leaves a write transaction open on the connection.
+    return json.dumps(list(ids))
+
+
+def import_json(db_path: str, people_file: str, marriages_file: str, validate: bool = True) -> "SqliteFamilyTree":
+    """
+    Bulk import the People/Marriages JSON files used by FamilyTree into a SQLite database.
+    Marriage ids follow file order, matching the "m<index>" ids of a freshly loaded FamilyTree.
+    Importing into an existing database replaces its tree in the same transaction.
+    Records are parsed and inserted one at a time, so the files are never held in memory.
+    With validate, data that FamilyTree would refuse to load (see validate_database)
+    raises FamilyTreeValidationError and the database is left as it was.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(SCHEMA)
+        with conn:
+            for table in ("name_keys", "name_tokens", "relations", "children", "marriages", "people"):
+                conn.execute("DELETE FROM " + table)
+            conn.executemany(
+                "INSERT INTO people (" + _PERSON_COLUMNS + ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        p["ID"],
+                        p["FirstName"],
+                        p.get("LastName", ""),
+                        json.dumps(list(p.get("MiddleNames", []))),
+                        p.get("MaidenName", ""),
+                        p.get("Suffix", ""),
+                        p.get("BirthDate"),
+                        p.get("DeathDate"),
+                        p["Gender"],
+                    )
+                    for p in iter_records(people_file)
+                ),
+            )
+            _fill_name_tables(conn, (Person.FromRecord(p) for p in iter_records(people_file)))
+            conn.executemany(
+                "INSERT INTO marriages (id, person1, person2, status, date) VALUES (?, ?, ?, ?, ?)",
+                ((i, m["Person1"], m["Person2"], m.get("Status"), m.get("Date")) for i, m in enumerate(iter_records(marriages_file))),
+            )
+            conn.executemany(
+                "INSERT INTO children (marriage_id, position, child_id) VALUES (?, ?, ?)",
+                ((i, pos, c) for i, m in enumerate(iter_records(marriages_file)) for pos, c in enumerate(m["Children"])),
+            )
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO relations (person_id, relative_id, up, down)
+                SELECT person1, person2, 0, 0 FROM marriages
+                UNION ALL SELECT person2, person1, 0, 0 FROM marriages
+                UNION ALL SELECT c.child_id, m.person1, 1, 0 FROM children c JOIN marriages m ON m.id = c.marriage_id
+                UNION ALL SELECT c.child_id, m.person2, 1, 0 FROM children c JOIN marriages m ON m.id = c.marriage_id
+                UNION ALL SELECT m.person1, c.child_id, 0, 1 FROM children c JOIN marriages m ON m.id = c.marriage_id
+                UNION ALL SELECT m.person2, c.child_id, 0, 1 FROM children c JOIN marriages m ON m.id = c.marriage_id
+                """
+            )
+            if validate:
+                report = validate_database(conn)
+                if not report.ok():
+                    raise FamilyTreeValidationError(report)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return SqliteFamilyTree(db_path)
+
+
+def _fill_name_tables(conn: sqlite3.Connection, people: Iterable[Person]):
+    conn.executemany(
+        "INSERT OR IGNORE INTO name_tokens (token, person_id) VALUES (?, ?)",
+        ((token, person.GetId()) for person in people for token in person_name_tokens(person)),
+    )
+    tokens = [row[0] for row in conn.execute("SELECT DISTINCT token FROM name_tokens")]
+    conn.executemany(
+        "INSERT OR IGNORE INTO name_keys (kind, key, token) VALUES (?, ?, ?)",
+        (
+            row
+            for token in tokens
+            for row in [(0, token, token), (1, soundex(token), token)] + [(2, key, token) for key in fuzzy_keys(token)]
+        ),
+    )
+
+
+def validate_database(conn: sqlite3.Connection) -> ValidationReport:
+    """
+    The errors validate_family_tree reports (self-marriages, more than two parents,
+    ancestry cycles), checked with queries over the stored tables instead of linked
+    Person objects. The warnings are not checked.
+    """
+    issues = [
+        self_marriage_issue(pid, "m" + str(mid))
+        for mid, pid in conn.execute("SELECT id, person1 FROM marriages WHERE person1 = person2 ORDER BY id")
+    ]
+    for pid, parents in conn.execute(
+        """
+        SELECT person_id, json_group_array(relative_id) FROM relations
+        WHERE up = 1 AND down = 0 GROUP BY person_id HAVING COUNT(*) > 2
+        ORDER BY person_id
+        """
+    ):
+        issues.append(too_many_parents_issue(pid, json.loads(parents)))
+
+    def children_of(pid):
+        return [row[0] for row in conn.execute(
+            "SELECT relative_id FROM relations WHERE person_id = ? AND up = 0 AND down = 1", (pid,)
+        )]
+
+    # Only people with both a parent and a child can be on a cycle.
+    roots = [row[0] for row in conn.execute(
+        """
+        SELECT DISTINCT person_id FROM relations WHERE up = 1 AND down = 0
+        INTERSECT SELECT DISTINCT person_id FROM relations WHERE up = 0 AND down = 1
+        """
+    )]
+    issues.extend(ancestry_cycle_issue(component) for component in ancestry_cycles(roots, children_of))
+    return ValidationReport(issues)
+
+
+class SqliteNameIndex(NameMatcher):
+    """
+    NameIndex ranking over the name_tokens and name_keys tables, so searching reads
+    only the index rows a query touches. Databases imported before the tables existed
+    get them on the first search.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._checked = False
+
+    def Search(self, query: str, limit: int = 20) -> List:
+        if not self._checked:
+            self._EnsureTables()
+            self._checked = True
+        return super().Search(query, limit)
+
+    def _EnsureTables(self):
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'name_keys'").fetchone() is not None:
+            return
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            rows = self.conn.execute("SELECT " + _PERSON_COLUMNS + " FROM people").fetchall()
+            _fill_name_tables(self.conn, (_person_from_row(row) for row in rows))
+
+    def _Prefixed(self, token) -> List[str]:
+        rows = self.conn.execute(
+            "SELECT token FROM name_keys WHERE kind = 0 AND key >= ? AND key < ?", (token, token + "\U0010ffff")
+        )
+        return [row[0] for row in rows]
+
+    def _Phonetic(self, code) -> List[str]:
+        return [row[0] for row in self.conn.execute("SELECT token FROM name_keys WHERE kind = 1 AND key = ?", (code,))]
+
+    def _Fuzzy(self, key) -> List[str]:
+        return [row[0] for row in self.conn.execute("SELECT token FROM name_keys WHERE kind = 2 AND key = ?", (key,))]
+
+    def _Ids(self, token) -> Set[int]:
+        return {row[0] for row in self.conn.execute("SELECT person_id FROM name_tokens WHERE token = ?", (token,))}
+
+
+class SqliteFamilyTree():
+    """
+    FamilyTree-compatible backend on a SQLite database built by import_json().
+
+    Person and Marriage objects are created per query. People returned by GetLocalPeople,
+    iter_ancestors, iter_descendants and iter_relatives are fully linked to each other (and to stub
+    objects for relatives just outside them), and GetPersonFromID hands out those linked
+    copies until the next such query; other people carry no links.
+    Generations are not stored; compute_canvas_layout derives them relative to the center.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self._materialised: Dict[int, Person] = {}
+        self._name_index = None
+
+    def close(self):
+        self.conn.close()
+
+    def GetPersonFromID(self, id):
+        person = self._materialised.get(id)
+        if person is not None:
+            return person
+        row = self.conn.execute("SELECT " + _PERSON_COLUMNS + " FROM people WHERE id = ?", (id,)).fetchone()
+        assert(row is not None)
+        return _person_from_row(row)
+
+    def GetNameIndex(self):
+        if self._name_index is None:
+            self._name_index = SqliteNameIndex(self.conn)
+        return self._name_index
+
+    def SearchPeople(self, query, limit=20):
+        return [self.GetPersonFromID(pid) for pid in self.GetNameIndex().Search(query, limit)]
+
+    def IsAncestor(self, potential_ancestor, subject) -> bool:
+        return potential_ancestor.GetId() in self._AncestorIds(subject.GetId())
+
+    def GetAncestorsOf(self, subject: Person):
+        ids = self._AncestorIds(subject.GetId())
+        return set(self._LoadPeople(ids).values())
+
+    def _AncestorIds(self, subject_id) -> Set[int]:
+        rows = self.conn.execute(
+            """
+            WITH RECURSIVE ancestors(id) AS (
+                SELECT ?
+                UNION
+                SELECT r.relative_id FROM relations r JOIN ancestors a ON r.person_id = a.id
+                WHERE r.up = 1 AND r.down = 0
+            )
+            SELECT id FROM ancestors WHERE id != ?
+            """,
+            (subject_id, subject_id),
+        )
+        return {row[0] for row in rows}
+
+    def iter_ancestors(self, subject: Person, max_depth=None, with_distance=False):
+        """
+        The ancestors of subject, nearest generation first, as linked Person objects
+        (see _Materialise); subject's own linked copy is then GetPersonFromID's.
+        """
+        return self._IterLinked(subject.GetId(), (1, 0), max_depth, with_distance)
+
+    def iter_descendants(self, subject: Person, max_depth=None, with_distance=False):
+        """The descendants of subject, nearest generation first, as linked Person objects."""
+        return self._IterLinked(subject.GetId(), (0, 1), max_depth, with_distance)
+
+    def iter_relatives(self, subject: Person, max_depth=None, with_distance=False):
+        """Everyone connected to subject by spouse, parent and child links, fewest links first."""
+        return self._IterLinked(subject.GetId(), None, max_depth, with_distance)
+
+    def _IterLinked(self, subject_id, step, max_depth, with_distance):
+        # One query per generation; each generation is materialised and yielded before
+        # the next is read. Visited people are never walked again, so cycles in the
+        # data end the walk instead of looping.
+        people: Dict[int, Person] = {}
+        built: Set[int] = set()
+        self._materialised = self._Materialise([subject_id], people, built)
+        visited = {subject_id}
+        frontier = [subject_id]
+        distance = 0
+        while frontier and (max_depth is None or distance < max_depth):
+            rows = self.conn.execute(
+                """
+                SELECT DISTINCT relative_id FROM relations
+                WHERE person_id IN (SELECT value FROM json_each(?))
+                AND (? OR (up = ? AND down = ?))
+                ORDER BY relative_id
+                """,
+                (_id_list(frontier), step is None, *(step or (0, 0))),
+            )
+            frontier = [pid for (pid,) in rows if pid not in visited]
+            visited.update(frontier)
+            distance += 1
+            self._Materialise(frontier, people, built)
+            for pid in frontier:
+                yield (people[pid], distance) if with_distance else people[pid]
+
+    def GetLocalPeople(self, center_id, max_up=2, max_down=2, max_nodes=200):
+        return self.GetLocalNeighbourhood(center_id, max_up, max_down, max_nodes)[0]
+
+    def GetLocalNeighbourhood(self, center_id, max_up=2, max_down=2, max_nodes=200):
+        """
+        People reachable from the center using at most max_up parent steps and max_down
+        child steps, closest relatives first, limited to max_nodes; plus the Cutoff when
+        the limit left relatives out. Only the relations rows of people the walk settles
+        are read.
+        """
+        self.GetPersonFromID(center_id)
+        local_ids, cutoff = select_local_neighbourhood(center_id, self._NeighbourIds, max_up, max_down, max_nodes)
+        self._materialised = self._Materialise(local_ids)
+        return [self._materialised[pid] for pid in local_ids], cutoff
+
+    def _NeighbourIds(self, pid):
+        spouses, parents, children = [], [], []
+        for relative_id, up, down in self.conn.execute(
+            "SELECT relative_id, up, down FROM relations WHERE person_id = ?", (pid,)
+        ):
+            (parents if up else children if down else spouses).append(relative_id)
+        return spouses, parents, children
+
+    def GetLocalMarriages(self, local_people):
+        return select_local_marriages(local_people)
+
+    def _LoadPeople(self, ids: Iterable[int]) -> Dict[int, Person]:
+        rows = self.conn.execute(
+            "SELECT " + _PERSON_COLUMNS + " FROM people WHERE id IN (SELECT value FROM json_each(?))",
+            (_id_list(ids),),
+        )
+        return {row[0]: _person_from_row(row) for row in rows}
+
+    def _Materialise(self, local_ids: List[int], people: Optional[Dict[int, Person]] = None, built: Optional[Set[int]] = None) -> Dict[int, Person]:
+        """
+        Build linked Person/Marriage objects for the local people and every marriage
+        they take part in, as spouse or as child. Given the people and built marriage
+        ids of an earlier call, the new objects are added to those, so a walk can
+        materialise one generation at a time.
+        """
+        people = {} if people is None else people
+        built = set() if built is None else built
+        marriage_rows = [row for row in self.conn.execute(
+            """
+            WITH local(id) AS (SELECT value FROM json_each(?))
+            SELECT id, person1, person2, status, date FROM marriages
+            WHERE id IN (
+                SELECT id FROM marriages WHERE person1 IN local
+                UNION SELECT id FROM marriages WHERE person2 IN local
+                UNION SELECT marriage_id FROM children WHERE child_id IN local
+            )
+            ORDER BY id
+            """,
+            (_id_list(local_ids),),
+        ) if row[0] not in built]
+
+        children_by_marriage: Dict[int, List[int]] = {}
+        member_ids = set(local_ids)
+        for row in marriage_rows:
+            member_ids.add(row[1])
+            member_ids.add(row[2])
+        if marriage_rows:
+            for marriage_id, child_id in self.conn.execute(
+                """
+                SELECT marriage_id, child_id FROM children
+                WHERE marriage_id IN (SELECT value FROM json_each(?))
+                ORDER BY marriage_id, position
+                """,
+                (_id_list(row[0] for row in marriage_rows),),
+            ):
+                children_by_marriage.setdefault(marriage_id, []).append(child_id)
+                member_ids.add(child_id)
+
+        people.update(self._LoadPeople(member_ids - people.keys()))
+        for mid, p1, p2, status, date in marriage_rows:
+            built.add(mid)
+            marriage = Marriage(people[p1], people[p2], [people[c] for c in children_by_marriage.get(mid, [])])
+            marriage.id = "m" + str(mid)
+            marriage.Status = status
+            marriage.Date = date
+        return people
+
+
+def _main(argv: Optional[List[str]] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import family tree JSON files into a SQLite database.")
+    parser.add_argument("db")
+    parser.add_argument("people")
+    parser.add_argument("marriages")
+    parser.add_argument("--no-validate", action="store_true", help="import without checking for ancestry cycles and other errors")
+    args = parser.parse_args(argv)
+    import_json(args.db, args.people, args.marriages, validate=not args.no_validate).close()
+
+
+if __name__ == "__main__":
+    _main()
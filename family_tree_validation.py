@@ -0,0 +1,197 @@
+"""
+Family graph validation.
+A single O(N + M) pass over the linked Person/Marriage objects that reports ancestry
+cycles (via strongly connected components), duplicate parent links, people with more
+than two parents, self-marriages and spouse/generation conflicts.
+"""
+
+from collections import deque
+from typing import Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+
+ERROR = "error"
+WARNING = "warning"
+
+
+class ValidationIssue(NamedTuple):
+    severity: str
+    kind: str
+    people: Tuple[int, ...]
+    message: str
+
+
+class ValidationReport():
+    def __init__(self, issues: List[ValidationIssue]):
+        self.issues = issues
+
+    @property
+    def errors(self) -> List[ValidationIssue]:
+        return [i for i in self.issues if i.severity == ERROR]
+
+    @property
+    def warnings(self) -> List[ValidationIssue]:
+        return [i for i in self.issues if i.severity == WARNING]
+
+    def ok(self) -> bool:
+        return not self.errors
+
+    def ByKind(self) -> Dict[str, List[ValidationIssue]]:
+        kinds: Dict[str, List[ValidationIssue]] = {}
+        for issue in self.issues:
+            kinds.setdefault(issue.kind, []).append(issue)
+        return kinds
+
+    def __str__(self):
+        if not self.issues:
+            return "No problems found"
+        lines = [f'{len(self.errors)} error(s), {len(self.warnings)} warning(s)']
+        for issue in self.issues[:50]:
+            lines.append(f'  {issue.severity}: {issue.message}')
+        if len(self.issues) > 50:
+            lines.append(f'  ... {len(self.issues) - 50} more')
+        return "\n".join(lines)
+
+
+class FamilyTreeValidationError(ValueError):
+    def __init__(self, report: ValidationReport):
+        super().__init__(str(report))
+        self.report = report
+
+
+def ancestry_cycles(ids: Iterable[int], children_of: Callable[[int], Iterable[int]]) -> List[List[int]]:
+    """
+    Strongly connected components of the parent -> child graph that contain a cycle
+    (iterative Tarjan), over person ids so backends without Person objects can use it.
+    """
+    index: Dict[int, int] = {}
+    low: Dict[int, int] = {}
+    on_stack = set()
+    stack = []
+    cycles = []
+    counter = 0
+
+    for root in ids:
+        if root in index:
+            continue
+        work = [(root, iter(children_of(root)))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            pid, children = work[-1]
+            advanced = False
+            for cid in children:
+                if cid not in index:
+                    index[cid] = low[cid] = counter
+                    counter += 1
+                    stack.append(cid)
+                    on_stack.add(cid)
+                    work.append((cid, iter(children_of(cid))))
+                    advanced = True
+                    break
+                if cid in on_stack:
+                    low[pid] = min(low[pid], index[cid])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent_id = work[-1][0]
+                low[parent_id] = min(low[parent_id], low[pid])
+            if low[pid] == index[pid]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == pid:
+                        break
+                if len(component) > 1 or pid in children_of(pid):
+                    cycles.append(sorted(component))
+    return cycles
+
+
+def self_marriage_issue(pid: int, marriage_id: str) -> ValidationIssue:
+    return ValidationIssue(ERROR, "self_marriage", (pid,), f'{pid} is married to themselves ({marriage_id})')
+
+
+def too_many_parents_issue(pid: int, parent_ids: Iterable[int]) -> ValidationIssue:
+    parents = sorted(parent_ids)
+    return ValidationIssue(ERROR, "too_many_parents", (pid, *parents), f'{pid} has {len(parents)} parents: {parents}')
+
+
+def ancestry_cycle_issue(component: List[int]) -> ValidationIssue:
+    return ValidationIssue(
+        ERROR, "ancestry_cycle", tuple(component),
+        f'ancestry cycle: {component} are each their own ancestor',
+    )
+
+
+def _generation_conflicts(people) -> List[Tuple[int, int, str]]:
+    """
+    Breadth-first relative generations per connected component; returns the
+    (person, relative, relation) links that disagree with what was already assigned.
+    """
+    generation: Dict[int, int] = {}
+    conflicts = []
+    reported = set()
+    for root in people:
+        if root.GetId() in generation:
+            continue
+        generation[root.GetId()] = 0
+        q = deque([root])
+        while q:
+            person = q.popleft()
+            g = generation[person.GetId()]
+            for relatives, expected, relation in (
+                (person.Parents, g + 1, "parent"),
+                (person.Children, g - 1, "child"),
+                (person.Spouses, g, "spouse"),
+            ):
+                for relative in relatives:
+                    rid = relative.GetId()
+                    if rid not in generation:
+                        generation[rid] = expected
+                        q.append(relative)
+                    elif generation[rid] != expected:
+                        pair = (min(person.GetId(), rid), max(person.GetId(), rid))
+                        if pair not in reported:
+                            reported.add(pair)
+                            conflicts.append((person.GetId(), rid, relation))
+    return conflicts
+
+
+def validate_family_tree(people, marriages) -> ValidationReport:
+    """Check linked people and marriages; runs in time linear in people plus links."""
+    issues: List[ValidationIssue] = []
+
+    for marriage in marriages:
+        if marriage.Person1 is marriage.Person2:
+            pid = marriage.Person1.GetId()
+            issues.append(self_marriage_issue(pid, marriage.GetId()))
+
+    for person in people:
+        pid = person.GetId()
+        counts: Dict[int, int] = {}
+        for parent in person.Parents:
+            counts[parent.GetId()] = counts.get(parent.GetId(), 0) + 1
+        duplicated = sorted(p for p, n in counts.items() if n > 1)
+        if duplicated:
+            issues.append(ValidationIssue(
+                WARNING, "duplicate_parent_link", (pid, *duplicated),
+                f'{pid} lists parent(s) {duplicated} more than once',
+            ))
+        if len(counts) > 2:
+            issues.append(too_many_parents_issue(pid, counts))
+
+    children = {person.GetId(): [c.GetId() for c in person.Children] for person in people}
+    for component in ancestry_cycles(children, children.__getitem__):
+        issues.append(ancestry_cycle_issue(component))
+
+    for pid, rid, relation in _generation_conflicts(people):
+        issues.append(ValidationIssue(
+            WARNING, "generation_conflict", (pid, rid),
+            f'{rid} as {relation} of {pid} implies a different generation than other links give',
+        ))
+
+    return ValidationReport(issues)
@@ -1,7 +1,9 @@
+import sys
+import threading
 import tkinter as tk
 from tkinter import Canvas
 from FamilyTree import FamilyTree
-from family_tree_layout import compute_canvas_layout
+from family_tree_layout import LAYOUT_MODES, compute_layout
 
 
 class ViewConfig:
@@ -18,7 +20,7 @@ class ViewConfig:
 
 
 class FamilyTreeViewer(tk.Frame):
-	def __init__(self, master, family_tree: FamilyTree, center_id: int):
+	def __init__(self, master, family_tree: FamilyTree, center_id: int, layout_mode: str = "canvas"):
 		super().__init__(master)
 		self.family_tree = family_tree
 		self.center_id = center_id
@@ -27,6 +29,7 @@ class FamilyTreeViewer(tk.Frame):
 		self.max_up = 3
 		self.max_down = 3
 		self.layout_sweeps = 10
+		self.layout_mode = layout_mode
 
 		self.scale = 1.0
 		self.offset_x = 0.0
@@ -35,6 +38,28 @@ class FamilyTreeViewer(tk.Frame):
 		self._drag_last = None
 		self._node_hitboxes = []
 
+		self._search_matches = []
+		self.search_bar = tk.Frame(self)
+		self.search_bar.pack(side=tk.TOP, fill=tk.X)
+		tk.Label(self.search_bar, text="Find:").pack(side=tk.LEFT, padx=(6, 2), pady=4)
+		self.search_var = tk.StringVar()
+		self.search_entry = tk.Entry(self.search_bar, textvariable=self.search_var, width=40)
+		self.search_entry.pack(side=tk.LEFT, pady=4)
+		self.search_entry.bind("<Return>", self._on_search)
+		self.search_entry.bind("<Down>", self._on_search_focus_results)
+		self.mode_var = tk.StringVar(value=layout_mode)
+		tk.OptionMenu(self.search_bar, self.mode_var, *LAYOUT_MODES, command=self._on_mode).pack(side=tk.RIGHT, padx=6, pady=2)
+		tk.Label(self.search_bar, text="Layout:").pack(side=tk.RIGHT, pady=4)
+		self.search_results = tk.Listbox(self, height=8, activestyle="dotbox")
+		self.search_results.bind("<Return>", self._on_search_pick)
+		self.search_results.bind("<Double-Button-1>", self._on_search_pick)
+		self.search_results.bind("<Escape>", self._hide_search_results)
+		# The first search would otherwise build the name index (every person in the
+		# tree) on the Tk thread, so it is built in the background from the start.
+		self._names_ready = threading.Event()
+		self._search_waiting = False
+		threading.Thread(target=self._build_name_index, daemon=True).start()
+
 		self.canvas = tk.Canvas(self, background="white", highlightthickness=0)
 		self.canvas.pack(fill=tk.BOTH, expand=True)
 
@@ -64,11 +89,14 @@ class FamilyTreeViewer(tk.Frame):
 	def _on_resize(self, _event):
 		self.redraw(center_on_load=False)
 
+	def _on_mode(self, mode):
+		self.layout_mode = mode
+		self.redraw(center_on_load=True)
+
 	def _on_left_down(self, event):
 		person_id = self._hit_test(event.x, event.y)
 		if person_id is not None:
-			self.center_id = person_id
-			self.redraw(center_on_load=True)
+			self._recenter(person_id)
 			return
 
 		self._drag_last = (event.x, event.y)
@@ -109,6 +137,59 @@ class FamilyTreeViewer(tk.Frame):
 
 		self.redraw(center_on_load=False)
 
+	def _build_name_index(self):
+		try:
+			self.family_tree.GetNameIndex()
+		finally:
+			self._names_ready.set()
+
+	def _on_search(self, _event=None):
+		query = self.search_var.get().strip()
+		if query and not self._names_ready.is_set():
+			self._search_matches = []
+			self.search_results.delete(0, tk.END)
+			self.search_results.insert(tk.END, "Indexing names ...")
+			self.search_results.pack(side=tk.TOP, fill=tk.X, before=self.canvas)
+			if not self._search_waiting:
+				self._search_waiting = True
+				self.after(100, self._on_search_retry)
+			return
+		self._search_matches = self.family_tree.SearchPeople(query, limit=20) if query else []
+		if len(self._search_matches) == 1:
+			self._recenter(self._search_matches[0].GetId())
+			return
+		self.search_results.delete(0, tk.END)
+		for person in self._search_matches:
+			self.search_results.insert(tk.END, f'{person.GetFullName()}  [{person.GetId()}]')
+		if self._search_matches:
+			self.search_results.pack(side=tk.TOP, fill=tk.X, before=self.canvas)
+			self.search_results.selection_clear(0, tk.END)
+			self.search_results.selection_set(0)
+		else:
+			self._hide_search_results()
+
+	def _on_search_retry(self):
+		self._search_waiting = False
+		self._on_search()
+
+	def _on_search_focus_results(self, _event):
+		if self._search_matches:
+			self.search_results.focus_set()
+			self.search_results.activate(0)
+
+	def _on_search_pick(self, _event):
+		selection = self.search_results.curselection()
+		if selection and selection[0] < len(self._search_matches):
+			self._recenter(self._search_matches[selection[0]].GetId())
+
+	def _hide_search_results(self, _event=None):
+		self.search_results.pack_forget()
+
+	def _recenter(self, person_id):
+		self._hide_search_results()
+		self.center_id = person_id
+		self.redraw(center_on_load=True)
+
 	def _hit_test(self, sx, sy):
 		for x1, y1, x2, y2, pid in self._node_hitboxes:
 			if x1 <= sx <= x2 and y1 <= sy <= y2:
@@ -116,9 +197,10 @@ class FamilyTreeViewer(tk.Frame):
 		return None
 
 	def redraw(self, center_on_load: bool):
-		layout = compute_canvas_layout(
+		layout = compute_layout(
 			self.family_tree,
 			self.center_id,
+			mode=self.layout_mode,
 			max_up=self.max_up,
 			max_down=self.max_down,
 			x_spacing=180,
@@ -127,6 +209,8 @@ class FamilyTreeViewer(tk.Frame):
 		)
 		positions = layout["positions"]
 		marriages = layout["marriages"]
+		# People with relatives that max_nodes left out get a dashed outline.
+		truncated = set(layout["cutoff"]["truncated"]) if layout["cutoff"] else set()
 
 		if center_on_load:
 			w = max(1, self.canvas.winfo_width())
@@ -137,8 +221,6 @@ class FamilyTreeViewer(tk.Frame):
 		self.canvas.delete("all")
 		self._node_hitboxes = []
 
-		people_by_id = {p.GetId(): p for p in self.family_tree.people}
-
 		def draw_polyline(world_points, width=1):
 			screen_points = []
 			for wx, wy in world_points:
@@ -206,11 +288,20 @@ class FamilyTreeViewer(tk.Frame):
 				child_anchor_y = cy - child_anchor_dy
 				draw_polyline([(cx, bus_y), (cx, child_anchor_y)], width=1)
 
+		# A chart person already drawn elsewhere (pedigree collapse, or descent through
+		# both parents) is shown again at the other slot as a dashed, unfilled box joined
+		# to the person it hangs from; clicking it recenters like any other node.
+		references = layout.get("references", [])
+		for reference in references:
+			anchor = reference.get("child", reference.get("parent"))
+			if anchor in positions:
+				draw_polyline([positions[anchor], tuple(reference["position"])], width=1)
+
 		# Draw nodes on top
-		for pid, (x, y) in positions.items():
-			person = people_by_id.get(pid)
-			if person is None:
-				continue
+		nodes = [(pid, x, y, False) for pid, (x, y) in positions.items()]
+		nodes += [(r["id"], r["position"][0], r["position"][1], True) for r in references]
+		for pid, x, y, is_reference in nodes:
+			person = self.family_tree.GetPersonFromID(pid)
 
 			sx, sy = self._world_to_screen(x, y)
 			w = self.config.node_w * self.scale
@@ -224,7 +315,11 @@ class FamilyTreeViewer(tk.Frame):
 			outline = "#000000" if pid == self.center_id else "#333333"
 
 			r = max(2, int(self.config.node_rx * self.scale))
-			self._rounded_rect(x1, y1, x2, y2, r, fill=fill, outline=outline, width=2)
+			dash = (4, 2) if pid in truncated or is_reference else None
+			if is_reference:
+				outline = fill
+				fill = "white"
+			self._rounded_rect(x1, y1, x2, y2, r, fill=fill, outline=outline, width=2, dash=dash)
 
 			label = person.GetNodeLabel()
 			font_size = max(6, int(10 * self.scale))
@@ -233,7 +328,7 @@ class FamilyTreeViewer(tk.Frame):
 				sy,
 				text=label,
 				font=("Segoe UI", font_size),
-				fill="white",
+				fill=outline if is_reference else "white",
 			)
 
 			self._node_hitboxes.append((x1, y1, x2, y2, pid))
@@ -269,19 +364,11 @@ class FamilyTreeViewer(tk.Frame):
 		return self.canvas.create_polygon(points, smooth=True, splinesteps=24, **kwargs)
 
 
-def main():
-	root = tk.Tk()
-	root.title("Family Tree Viewer")
-	root.geometry("1200x800")
-
-	# family_tree = FamilyTree("data/example_people.json", "data/example_marriages.json")
-	family_tree = FamilyTree("data/my_people.json", "data/my_marriages.json")
-	center_id = 6
-
-	viewer = FamilyTreeViewer(root, family_tree, center_id=center_id)
-	viewer.pack(fill=tk.BOTH, expand=True)
-
-	root.mainloop()
+def main(argv=None):
+	# The command-line entry point shows the window before the tree has loaded;
+	# "python family_tree_viewer.py --people ... --center ..." takes the same options as "view".
+	from family_tree_cli import main as cli_main
+	cli_main(["view"] + list(sys.argv[1:] if argv is None else argv))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,184 @@
+"""
+GEDCOM reading (names, pedigree links, placeholder spouses) and the write/read round trip.
+"""
+
+import os
+import tempfile
+import unittest
+
+from FamilyTree import FamilyTree
+from family_tree_gedcom import read_gedcom, read_gedcom_records, write_gedcom
+
+GEDCOM = """0 HEAD
+1 CHAR UTF-8
+0 @I1@ INDI
+1 NAME John Paul /Smith/ Jr.
+1 SEX M
+1 BIRT
+2 DATE 12 MAR 1890
+1 DEAT
+2 DATE 1950
+1 FAMS @F1@
+0 @I2@ INDI
+1 NAME Mary /Smith/
+2 TYPE married
+1 NAME Mary /Jones/
+2 TYPE birth
+1 SEX F
+1 FAMS @F1@
+0 @I3@ INDI
+1 NAME Anne /Brown/
+2 _MARNM Taylor
+1 SEX F
+1 FAMS @F3@
+0 @I4@ INDI
+1 NAME Beth /Green/
+1 _MARNM White
+1 SEX F
+0 @I5@ INDI
+1 NAME Carl /Smith/
+1 SEX M
+1 FAMC @F1@
+1 FAMC @F2@
+2 PEDI adopted
+0 @I6@ INDI
+1 NAME Dora /Smith/
+1 SEX F
+1 FAMC @F2@
+2 PEDI adopted
+1 FAMC @F1@
+0 @I7@ INDI
+1 NAME Tom /Taylor/
+1 SEX M
+1 FAMS @F2@
+1 NOTE first line
+2 CONT second line
+0 @I8@ INDI
+1 NAME Eve /Taylor/
+1 SEX F
+1 FAMS @F2@
+0 @I9@ INDI
+1 NAME Finn /Taylor/
+1 SEX M
+1 FAMC @F3@
+0 @F1@ FAM
+1 HUSB @I1@
+1 WIFE @I2@
+1 MARR
+2 DATE 1915
+1 CHIL @I5@
+1 CHIL @I6@
+0 @F2@ FAM
+1 HUSB @I7@
+1 WIFE @I8@
+1 DIV Y
+1 CHIL @I5@
+1 CHIL @I6@
+0 @F3@ FAM
+1 WIFE @I3@
+1 CHIL @I9@
+0 @F4@ FAM
+1 WIFE @I4@
+0 TRLR
+"""
+
+
+class GedcomTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "tree.ged")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write(GEDCOM)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+class ReadGedcomTest(GedcomTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tree = read_gedcom(self.path)
+
+    def test_names_dates_and_ids(self):
+        john = self.tree.GetPersonFromID(1)
+        self.assertEqual((john.FirstName, john.MiddleNames, john.LastName, john.Suffix), ("John", ["Paul"], "Smith", "Jr."))
+        self.assertEqual((john.Gender, john.BirthDate, john.DeathDate), ("Male", "12 MAR 1890", "1950"))
+
+    def test_name_types(self):
+        mary = self.tree.GetPersonFromID(2)
+        self.assertEqual((mary.LastName, mary.MaidenName), ("Smith", "Jones"))
+
+    def test_married_surname_tags(self):
+        anne = self.tree.GetPersonFromID(3)
+        beth = self.tree.GetPersonFromID(4)
+        self.assertEqual((anne.LastName, anne.MaidenName), ("Taylor", "Brown"))
+        self.assertEqual((beth.LastName, beth.MaidenName), ("White", "Green"))
+
+    def test_children_have_one_birth_family(self):
+        carl = self.tree.GetPersonFromID(5)
+        dora = self.tree.GetPersonFromID(6)
+        self.assertEqual(sorted(p.GetId() for p in carl.Parents), [1, 2])
+        self.assertEqual(sorted(p.GetId() for p in dora.Parents), [1, 2])
+        by_spouses = {(m.Person1.GetId(), m.Person2.GetId()): m for m in self.tree.marriages}
+        self.assertEqual([c.GetId() for c in by_spouses[(1, 2)].Children], [5, 6])
+        adoptive = by_spouses[(7, 8)]
+        self.assertEqual(adoptive.Children, [])
+        self.assertEqual([(c.GetId(), pedigree) for c, pedigree in adoptive.OtherChildren], [(5, "adopted"), (6, "adopted")])
+        self.assertEqual((adoptive.Status, by_spouses[(1, 2)].Date), ("Divorced", "1915"))
+
+    def test_single_parent_family_gets_a_placeholder(self):
+        finn = self.tree.GetPersonFromID(9)
+        self.assertEqual(len(finn.Parents), 2)
+        placeholder = next(p for p in finn.Parents if p.GetId() != 3)
+        self.assertEqual((placeholder.FirstName, placeholder.Gender), ("Unknown", "Male"))
+        self.assertGreater(placeholder.GetId(), 9)
+        # A single parent with no children is not a family.
+        self.assertEqual(self.tree.GetPersonFromID(4).Marriages, [])
+
+    def test_xref_collisions_get_fresh_ids(self):
+        path = os.path.join(self.dir.name, "clash.ged")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("0 @I1@ INDI\n1 NAME A /X/\n0 @P1@ INDI\n1 NAME B /X/\n0 @I3@ INDI\n1 NAME C /X/\n0 TRLR\n")
+        people, _ = read_gedcom_records(path)
+        self.assertEqual([(p.FirstName, p.GetId()) for p in people], [("A", 1), ("B", 4), ("C", 3)])
+
+
+class RoundTripTest(GedcomTestCase):
+    def _people(self, tree):
+        # GEDCOM keeps given names as one string, so "Grandpa A" comes back as a first and a middle name.
+        return {
+            p.GetId(): (" ".join([p.FirstName, *p.MiddleNames]), p.LastName, p.MaidenName, p.Suffix, p.Gender, p.BirthDate, p.DeathDate)
+            for p in tree.people
+        }
+
+    def _families(self, tree):
+        return sorted(
+            (
+                tuple(sorted((m.Person1.GetId(), m.Person2.GetId()))),
+                tuple(c.GetId() for c in m.Children),
+                tuple((c.GetId(), pedigree) for c, pedigree in m.OtherChildren),
+                m.Date,
+                m.Status,
+            )
+            for m in tree.marriages
+        )
+
+    def test_gedcom_round_trip(self):
+        tree = read_gedcom(self.path)
+        written = os.path.join(self.dir.name, "written.ged")
+        write_gedcom(tree, written)
+        again = read_gedcom(written)
+        self.assertEqual(self._people(again), self._people(tree))
+        self.assertEqual(self._families(again), self._families(tree))
+
+    def test_json_tree_round_trip(self):
+        tree = FamilyTree("data/example_people.json", "data/example_marriages.json")
+        written = os.path.join(self.dir.name, "example.ged")
+        write_gedcom(tree, written)
+        again = read_gedcom(written)
+        self.assertEqual(self._people(again), self._people(tree))
+        self.assertEqual(self._families(again), self._families(tree))
+
+
+if __name__ == "__main__":
+    unittest.main()
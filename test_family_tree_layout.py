@@ -0,0 +1,42 @@
+"""
+Chart layouts on a tree with pedigree collapse: first cousins 6 and 7 share the
+grandparents 0 and 1, and 8 is their child.
+"""
+
+import unittest
+
+from FamilyTree import FamilyTree, Marriage, Person
+from family_tree_layout import compute_layout
+
+
+def _cousin_tree():
+    genders = {0: "Male", 1: "Female", 2: "Male", 3: "Female", 4: "Female", 5: "Male", 6: "Male", 7: "Female", 8: "Male"}
+    people = {pid: Person.FromRecord({"ID": pid, "FirstName": f'p{pid}', "Gender": gender}) for pid, gender in genders.items()}
+    marriages = [
+        Marriage(people[0], people[1], [people[2], people[3]]),
+        Marriage(people[2], people[4], [people[6]]),
+        Marriage(people[5], people[3], [people[7]]),
+        Marriage(people[6], people[7], [people[8]]),
+    ]
+    return FamilyTree.FromPeopleAndMarriages(people.values(), marriages)
+
+
+class ChartLayoutTest(unittest.TestCase):
+    def test_pedigree_collapse_is_a_reference_without_a_child_link(self):
+        layout = compute_layout(_cousin_tree(), 8, "pedigree", max_up=3)
+        self.assertEqual(sorted((r["id"], r["child"]) for r in layout["references"]), [(0, 3), (1, 3)])
+        children = {tuple(m["spouses"]): m["children"] for m in layout["marriages"]}
+        self.assertEqual(children[(0, 1)], [2])
+        self.assertEqual(children[(5, 3)], [7])
+        self.assertEqual(children[(6, 7)], [8])
+
+    def test_descendant_through_two_parents_is_listed_once(self):
+        layout = compute_layout(_cousin_tree(), 0, "descendants", max_down=3)
+        self.assertEqual([(r["id"], r["parent"]) for r in layout["references"]], [(8, 7)])
+        children = {tuple(m["spouses"]): m["children"] for m in layout["marriages"]}
+        self.assertEqual(children[(6, 7)], [8])
+        self.assertEqual(children[(0, 1)], [2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+LazyFamilyTree against the in-memory FamilyTree, and its refusal to answer
+whole-tree questions from the part it has loaded.
+"""
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from FamilyTree import FamilyTree
+from family_tree_layout import LAYOUT_MODES, compute_layout
+from family_tree_lazy import LazyFamilyTree
+
+
+def _copy_example(directory):
+    # The index is written next to the people file, so work on copies.
+    files = []
+    for name in ("example_people.json", "example_marriages.json"):
+        files.append(shutil.copy(os.path.join("data", name), directory))
+    return files
+
+
+def _write_random_tree(directory, seed, generations=6, width=12):
+    rng = random.Random(seed)
+    people = [{"ID": pid, "FirstName": f'p{pid}', "Gender": "Male" if pid % 2 == 0 else "Female"} for pid in range(generations * width)]
+    marriages = []
+    for g in range(generations):
+        orphans = list(range((g + 1) * width, (g + 2) * width)) if g + 1 < generations else []
+        rng.shuffle(orphans)
+        men = range(g * width, (g + 1) * width, 2)
+        women = range(g * width + 1, (g + 1) * width, 2)
+        for _ in range(width // 2 + 2):
+            n = min(rng.randrange(4), len(orphans))
+            marriages.append({"Person1": rng.choice(men), "Person2": rng.choice(women), "Children": [orphans.pop() for _ in range(n)]})
+    # Records are shuffled so file order and id order differ.
+    rng.shuffle(people)
+    people_file = os.path.join(directory, "people.json")
+    marriages_file = os.path.join(directory, "marriages.json")
+    with open(people_file, "w") as file:
+        json.dump({"People": people}, file, indent=1)
+    with open(marriages_file, "w") as file:
+        json.dump({"Marriages": marriages}, file, indent=1)
+    return people_file, marriages_file
+
+
+def _walk(it):
+    return sorted((distance, p.GetId()) for p, distance in it)
+
+
+def _marriages(marriages):
+    return sorted(((m.Person1.GetId(), m.Person2.GetId()), tuple(c.GetId() for c in m.Children)) for m in marriages)
+
+
+class ParityTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _check(self, people_file, marriages_file):
+        expected = FamilyTree(people_file, marriages_file)
+        for person in expected.people:
+            pid = person.GetId()
+            # A fresh tree per center, so nothing is answered from an earlier walk.
+            for name in ("iter_ancestors", "iter_descendants", "iter_relatives"):
+                tree = LazyFamilyTree(people_file, marriages_file)
+                self.assertEqual(
+                    _walk(getattr(tree, name)(tree.GetPersonFromID(pid), with_distance=True)),
+                    _walk(getattr(expected, name)(person, with_distance=True)),
+                    (name, pid),
+                )
+            tree = LazyFamilyTree(people_file, marriages_file)
+            local = tree.GetLocalPeople(pid)
+            expected_local = expected.GetLocalPeople(pid)
+            self.assertEqual([p.GetId() for p in local], [p.GetId() for p in expected_local], pid)
+            self.assertEqual(_marriages(tree.GetLocalMarriages(local)), _marriages(expected.GetLocalMarriages(expected_local)), pid)
+            for mode in LAYOUT_MODES:
+                tree = LazyFamilyTree(people_file, marriages_file)
+                self.assertEqual(compute_layout(tree, pid, mode)["positions"], compute_layout(expected, pid, mode)["positions"], (pid, mode))
+        tree = LazyFamilyTree(people_file, marriages_file)
+        batch = tree.GetLocalNeighbourhoods([p.GetId() for p in expected.people], max_nodes=15)
+        for pid, (people, marriages) in batch.items():
+            expected_local = expected.GetLocalPeople(pid, max_nodes=15)
+            self.assertEqual([p.GetId() for p in people], [p.GetId() for p in expected_local], pid)
+            self.assertEqual(_marriages(marriages), _marriages(expected.GetLocalMarriages(expected_local)), pid)
+
+    def test_example_data(self):
+        self._check(*_copy_example(self.dir.name))
+
+    def test_random_trees(self):
+        for seed in range(3):
+            with tempfile.TemporaryDirectory() as directory:
+                self._check(*_write_random_tree(directory, seed))
+
+
+class LazyTreeTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.people_file, self.marriages_file = _copy_example(self.dir.name)
+        self.tree = LazyFamilyTree(self.people_file, self.marriages_file)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_whole_tree_operations_are_refused(self):
+        self.tree.GetLocalPeople(6)
+        for operation in (
+            lambda: self.tree.people,
+            lambda: self.tree.marriages,
+            self.tree.FindDuplicates,
+            self.tree.GetStatistics,
+        ):
+            with self.assertRaises(NotImplementedError):
+                operation()
+        self.assertIsNone(self.tree.validation_report)
+
+    def test_search_matches_the_in_memory_tree(self):
+        expected = FamilyTree(self.people_file, self.marriages_file)
+        for query in ("grandpa", "brothr", "m", "zz"):
+            self.assertEqual([p.GetId() for p in self.tree.SearchPeople(query)], [p.GetId() for p in expected.SearchPeople(query)], query)
+
+    def test_stale_index_is_rebuilt(self):
+        with open(self.people_file) as file:
+            data = json.load(file)
+        data["People"][0]["FirstName"] = "Renamed"
+        with open(self.people_file, "w") as file:
+            json.dump(data, file)
+        tree = LazyFamilyTree(self.people_file, self.marriages_file)
+        pid = data["People"][0]["ID"]
+        self.assertEqual(tree.GetPersonFromID(pid).FirstName, "Renamed")
+        self.assertEqual([p.GetId() for p in tree.GetLocalPeople(pid)], [p.GetId() for p in FamilyTree(self.people_file, self.marriages_file).GetLocalPeople(pid)])
+
+
+if __name__ == "__main__":
+    unittest.main()
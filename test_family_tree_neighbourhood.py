@@ -0,0 +1,132 @@
+"""
+Neighbourhood selection against a plain breadth-first walk of the original
+GetLocalPeople and against every (person, up, down) state reachable within the limits.
+"""
+
+import random
+import unittest
+from collections import deque
+
+from FamilyTree import FamilyTree, Marriage, Person
+from family_tree_neighbourhood import select_local_ids_batch, select_local_neighbourhood
+
+
+def _tree(genders, marriages):
+    people = {pid: Person.FromRecord({"ID": pid, "FirstName": f'p{pid}', "Gender": gender}) for pid, gender in genders.items()}
+    linked = [Marriage(people[a], people[b], [people[c] for c in children]) for a, b, children in marriages]
+    return FamilyTree.FromPeopleAndMarriages(people.values(), linked, validate=False)
+
+
+def _baseline(tree, center_id, max_up, max_down):
+    # The breadth-first walk GetLocalPeople used before closest-first selection.
+    best = {center_id: (0, 0)}
+    q = deque([(center_id, 0, 0)])
+    while q:
+        pid, up_used, down_used = q.popleft()
+        spouses, parents, children = tree._NeighbourIds(pid)
+        steps = [(rid, up_used, down_used) for rid in spouses]
+        if up_used < max_up:
+            steps += [(rid, up_used + 1, down_used) for rid in parents]
+        if down_used < max_down:
+            steps += [(rid, up_used, down_used + 1) for rid in children]
+        for rid, up, down in steps:
+            prev = best.get(rid)
+            if prev is None or (up, down) < prev:
+                best[rid] = (up, down)
+                q.append((rid, up, down))
+    return set(best)
+
+
+def _reachable(tree, center_id, max_up, max_down):
+    seen = {(center_id, 0, 0)}
+    q = deque(seen)
+    while q:
+        pid, up_used, down_used = q.popleft()
+        spouses, parents, children = tree._NeighbourIds(pid)
+        steps = [(rid, up_used, down_used) for rid in spouses]
+        if up_used < max_up:
+            steps += [(rid, up_used + 1, down_used) for rid in parents]
+        if down_used < max_down:
+            steps += [(rid, up_used, down_used + 1) for rid in children]
+        for state in steps:
+            if state not in seen:
+                seen.add(state)
+                q.append(state)
+    return {pid for pid, _, _ in seen}
+
+
+def _random_tree(rng, n):
+    genders = {pid: ("Male" if pid % 2 == 0 else "Female") for pid in range(n)}
+    marriages = []
+    has_parents = set()
+    for a in range(0, n, 2):
+        for _ in range(rng.randint(0, 2)):
+            b = rng.randrange(1, n, 2)
+            children = [c for c in rng.sample(range(n), rng.randint(0, 3)) if c > max(a, b) and c not in has_parents]
+            has_parents.update(children)
+            marriages.append((a, b, children))
+    return _tree(genders, marriages)
+
+
+class SelectLocalNeighbourhoodTest(unittest.TestCase):
+    def test_longer_path_with_fewer_parent_steps_is_walked(self):
+        # C -> P -> G uses both parent steps; C -> S -> S2 -> G reaches G with one
+        # to spare, which is the only way to G's parents 7 and 8 with max_up=2.
+        C, P, PM, G, GW, S, S2, G2, GG1, GG2 = range(10)
+        tree = _tree(
+            {C: "Male", P: "Male", PM: "Female", G: "Male", GW: "Female", S: "Female", S2: "Male", G2: "Female", GG1: "Male", GG2: "Female"},
+            [(G, GW, [P]), (P, PM, [C]), (C, S, []), (S2, S, []), (G, G2, [S2]), (GG1, GG2, [G])],
+        )
+        ids, cutoff = select_local_neighbourhood(C, tree._NeighbourIds, max_up=2, max_down=2, max_nodes=200)
+        self.assertIn(GG1, ids)
+        self.assertIn(GG2, ids)
+        self.assertEqual(set(ids), _baseline(tree, C, 2, 2))
+        self.assertIsNone(cutoff)
+
+    def test_matches_every_reachable_state(self):
+        rng = random.Random(7)
+        for _ in range(40):
+            tree = _random_tree(rng, rng.randint(5, 60))
+            for max_up, max_down in ((1, 1), (2, 2), (3, 1)):
+                center = rng.randrange(len(tree.people))
+                ids, cutoff = select_local_neighbourhood(center, tree._NeighbourIds, max_up, max_down, max_nodes=1000)
+                self.assertEqual(len(ids), len(set(ids)))
+                self.assertEqual(set(ids), _reachable(tree, center, max_up, max_down))
+                self.assertTrue(_baseline(tree, center, max_up, max_down) <= set(ids))
+                self.assertIsNone(cutoff)
+
+    def test_budget_goes_to_closest_and_reports_cutoff(self):
+        rng = random.Random(11)
+        for _ in range(40):
+            tree = _random_tree(rng, 60)
+            center = rng.randrange(60)
+            everyone, _ = select_local_neighbourhood(center, tree._NeighbourIds, 3, 3, max_nodes=1000)
+            ids, cutoff = select_local_neighbourhood(center, tree._NeighbourIds, 3, 3, max_nodes=10)
+            self.assertEqual(ids, everyone[:10])
+            if len(everyone) > 10:
+                self.assertIsNotNone(cutoff)
+                self.assertTrue(set(cutoff.truncated) <= set(ids))
+            else:
+                self.assertIsNone(cutoff)
+
+    def test_batch_matches_single_centers(self):
+        tree = _random_tree(random.Random(3), 80)
+        batch = select_local_ids_batch(range(80), tree._NeighbourIds, 2, 2, 15)
+        for center in range(80):
+            self.assertEqual(batch[center], select_local_neighbourhood(center, tree._NeighbourIds, 2, 2, 15)[0])
+
+    def test_small_batch_does_not_build_adjacency(self):
+        tree = _random_tree(random.Random(5), 40)
+        built = []
+
+        def adjacency():
+            built.append(True)
+            return tree._AdjacencyTable()
+
+        batch = select_local_ids_batch(range(40), tree._NeighbourIds, 2, 2, 15, workers=4, adjacency=adjacency)
+        self.assertEqual(built, [])
+        self.assertEqual(batch, select_local_ids_batch(range(40), tree._NeighbourIds, 2, 2, 15))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+"""
+SqliteFamilyTree against the in-memory FamilyTree on the example data, and its
+behaviour next to other connections to the same database.
+"""
+
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+
+from FamilyTree import FamilyTree
+from family_tree_layout import LAYOUT_MODES, compute_layout
+from family_tree_sqlite import SqliteFamilyTree, import_json
+from family_tree_validation import FamilyTreeValidationError
+
+PEOPLE = "data/example_people.json"
+MARRIAGES = "data/example_marriages.json"
+
+
+class SqliteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.dir.name, "tree.db")
+        self.tree = import_json(self.db_path, PEOPLE, MARRIAGES)
+
+    def tearDown(self):
+        self.tree.close()
+        self.dir.cleanup()
+
+
+class LockingTest(SqliteTestCase):
+    def test_queries_leave_no_transaction_open(self):
+        self.tree.GetLocalPeople(6)
+        list(self.tree.iter_ancestors(self.tree.GetPersonFromID(6)))
+        self.tree.GetAncestorsOf(self.tree.GetPersonFromID(6))
+        self.assertFalse(self.tree.conn.in_transaction)
+
+    def test_other_connections_can_write_while_a_tree_is_open(self):
+        self.tree.GetLocalPeople(6)
+        other = sqlite3.connect(self.db_path, timeout=0)
+        try:
+            with other:
+                other.execute("UPDATE people SET suffix = 'Jr' WHERE id = 6")
+        finally:
+            other.close()
+        self.assertEqual(self.tree.conn.execute("SELECT suffix FROM people WHERE id = 6").fetchone(), ("Jr",))
+
+    def test_reimport_while_a_tree_is_open(self):
+        before = [p.GetId() for p in self.tree.GetLocalPeople(6)]
+        import_json(self.db_path, PEOPLE, MARRIAGES).close()
+        self.assertEqual([p.GetId() for p in self.tree.GetLocalPeople(6)], before)
+
+
+class SearchTest(SqliteTestCase):
+    def test_search_matches_the_in_memory_index(self):
+        tree = FamilyTree(PEOPLE, MARRIAGES)
+        for query in ("grandpa", "grand", "gran a", "brothr", "brother in", "m", "dotter", "zz"):
+            self.assertEqual(
+                [p.GetId() for p in self.tree.SearchPeople(query)],
+                [p.GetId() for p in tree.SearchPeople(query)],
+                query,
+            )
+
+    def test_tables_are_built_for_older_databases(self):
+        expected = [p.GetId() for p in self.tree.SearchPeople("grandma")]
+        self.tree.close()
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.execute("DROP TABLE name_keys")
+            conn.execute("DROP TABLE name_tokens")
+        conn.close()
+        self.tree = SqliteFamilyTree(self.db_path)
+        self.assertEqual([p.GetId() for p in self.tree.SearchPeople("grandma")], expected)
+        self.assertEqual(expected[:2], [1, 3])
+
+
+def _write_tree(directory, people, marriages):
+    people_file = os.path.join(directory, "people.json")
+    marriages_file = os.path.join(directory, "marriages.json")
+    with open(people_file, "w") as file:
+        json.dump({"People": [{"ID": pid, "FirstName": f'p{pid}', "Gender": gender} for pid, gender in people]}, file)
+    with open(marriages_file, "w") as file:
+        json.dump({"Marriages": [{"Person1": a, "Person2": b, "Children": c} for a, b, c in marriages]}, file)
+    return people_file, marriages_file
+
+
+def _random_tree(seed, generations=6, width=12):
+    """
+    People in generations of width, married within their generation and parents of
+    people one generation down, so there are no cycles and nobody has more than two parents.
+    """
+    rng = random.Random(seed)
+    people = [(pid, "Male" if pid % 2 == 0 else "Female") for pid in range(generations * width)]
+    marriages = []
+    for g in range(generations):
+        row = range(g * width, (g + 1) * width)
+        orphans = list(range((g + 1) * width, (g + 2) * width)) if g + 1 < generations else []
+        rng.shuffle(orphans)
+        men = [pid for pid in row if pid % 2 == 0]
+        women = [pid for pid in row if pid % 2 == 1]
+        for _ in range(width // 2 + 2):
+            n = min(rng.randrange(4), len(orphans))
+            marriages.append((rng.choice(men), rng.choice(women), [orphans.pop() for _ in range(n)]))
+    return people, marriages
+
+
+def _walk(it):
+    return sorted((distance, p.GetId()) for p, distance in it)
+
+
+def _marriages(marriages):
+    return sorted(((m.Person1.GetId(), m.Person2.GetId()), tuple(c.GetId() for c in m.Children)) for m in marriages)
+
+
+class ParityTest(unittest.TestCase):
+    """SqliteFamilyTree answers every query the way FamilyTree does on the same files."""
+
+    def _check(self, people_file, marriages_file):
+        expected = FamilyTree(people_file, marriages_file)
+        with tempfile.TemporaryDirectory() as directory:
+            tree = import_json(os.path.join(directory, "tree.db"), people_file, marriages_file)
+            try:
+                for person in expected.people:
+                    pid = person.GetId()
+                    other = tree.GetPersonFromID(pid)
+                    for name in ("iter_ancestors", "iter_descendants", "iter_relatives"):
+                        for max_depth in (None, 2):
+                            self.assertEqual(
+                                _walk(getattr(tree, name)(other, max_depth=max_depth, with_distance=True)),
+                                _walk(getattr(expected, name)(person, max_depth=max_depth, with_distance=True)),
+                                (name, pid, max_depth),
+                            )
+                    self.assertEqual({p.GetId() for p in tree.GetAncestorsOf(other)}, {p.GetId() for p in expected.GetAncestorsOf(person)})
+                    for limits in ({}, {"max_up": 1, "max_down": 3, "max_nodes": 12}):
+                        local = tree.GetLocalPeople(pid, **limits)
+                        expected_local = expected.GetLocalPeople(pid, **limits)
+                        self.assertEqual([p.GetId() for p in local], [p.GetId() for p in expected_local], (pid, limits))
+                        self.assertEqual(_marriages(tree.GetLocalMarriages(local)), _marriages(expected.GetLocalMarriages(expected_local)), (pid, limits))
+                    for mode in LAYOUT_MODES:
+                        self.assertEqual(compute_layout(tree, pid, mode)["positions"], compute_layout(expected, pid, mode)["positions"], (pid, mode))
+            finally:
+                tree.close()
+
+    def test_example_data(self):
+        self._check(PEOPLE, MARRIAGES)
+
+    def test_random_trees(self):
+        for seed in range(3):
+            with tempfile.TemporaryDirectory() as directory:
+                self._check(*_write_tree(directory, *_random_tree(seed)))
+
+
+class ValidationTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.dir.name, "tree.db")
+        # 0 and 1 are each other's parent, with spouses 2 and 3.
+        self.cyclic = _write_tree(self.dir.name, [(0, "Male"), (1, "Male"), (2, "Female"), (3, "Female")], [(0, 2, [1]), (1, 3, [0])])
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_cycle_is_refused_and_database_kept(self):
+        import_json(self.db_path, PEOPLE, MARRIAGES).close()
+        with self.assertRaises(FamilyTreeValidationError) as raised:
+            import_json(self.db_path, *self.cyclic)
+        self.assertEqual([i.kind for i in raised.exception.report.errors], ["ancestry_cycle"])
+        self.assertEqual(raised.exception.report.errors[0].people, (0, 1))
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with open(PEOPLE) as file:
+                expected = len(json.load(file)["People"])
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM people").fetchone(), (expected,))
+        finally:
+            conn.close()
+
+    def test_too_many_parents_is_refused(self):
+        files = _write_tree(
+            self.dir.name,
+            [(0, "Male"), (1, "Female"), (2, "Male"), (3, "Female"), (4, "Male")],
+            [(0, 1, [4]), (2, 3, [4])],
+        )
+        with self.assertRaises(FamilyTreeValidationError) as raised:
+            import_json(self.db_path, *files)
+        self.assertEqual([(i.kind, i.people) for i in raised.exception.report.errors], [("too_many_parents", (4, 0, 1, 2, 3))])
+
+    def test_walks_end_on_unvalidated_cycles(self):
+        tree = import_json(self.db_path, *self.cyclic, validate=False)
+        try:
+            person = tree.GetPersonFromID(0)
+            self.assertEqual([(p.GetId(), d) for p, d in tree.iter_ancestors(person, with_distance=True)], [(1, 1), (3, 1), (2, 2)])
+            self.assertEqual([p.GetId() for p in tree.iter_descendants(person)], [1])
+            self.assertEqual([p.GetId() for p in tree.iter_relatives(person)], [1, 2, 3])
+            self.assertEqual({p.GetId() for p in tree.GetAncestorsOf(person)}, {1, 2, 3})
+        finally:
+            tree.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+validate_family_tree on small linked trees, and FamilyTree refusing to load the ones with errors.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from FamilyTree import FamilyTree, Marriage, Person
+from family_tree_validation import FamilyTreeValidationError, ancestry_cycles, validate_family_tree
+
+
+def _people(genders):
+    return {pid: Person.FromRecord({"ID": pid, "FirstName": f'p{pid}', "Gender": gender}) for pid, gender in genders.items()}
+
+
+class AncestryCyclesTest(unittest.TestCase):
+    def test_components_are_sorted_and_separate(self):
+        children = {0: [1], 1: [2], 2: [0, 3], 3: [], 4: [5], 5: [4], 6: [6], 7: [0]}
+        self.assertEqual(ancestry_cycles(children, children.__getitem__), [[0, 1, 2], [4, 5], [6]])
+
+    def test_no_cycles_in_a_dag(self):
+        # 3 is reached twice, which is pedigree collapse rather than a cycle.
+        children = {0: [1, 2], 1: [3], 2: [3], 3: []}
+        self.assertEqual(ancestry_cycles(children, children.__getitem__), [])
+
+    def test_deep_chains_do_not_recurse(self):
+        n = 50000
+        children = {i: [i + 1] for i in range(n)}
+        children[n] = [0]
+        self.assertEqual(ancestry_cycles(children, children.__getitem__), [list(range(n + 1))])
+
+
+class ValidateFamilyTreeTest(unittest.TestCase):
+    def test_cycle_is_reported_once_per_component(self):
+        people = _people({0: "Male", 1: "Male", 2: "Female", 3: "Female"})
+        marriages = [Marriage(people[0], people[2], [people[1]]), Marriage(people[1], people[3], [people[0]])]
+        with self.assertRaises(FamilyTreeValidationError) as raised:
+            FamilyTree.FromPeopleAndMarriages(people.values(), marriages)
+        errors = raised.exception.report.errors
+        self.assertEqual([(i.kind, i.people) for i in errors], [("ancestry_cycle", (0, 1))])
+
+    def test_too_many_parents_refuses_to_load(self):
+        people = _people({0: "Male", 1: "Female", 2: "Male", 3: "Female", 4: "Male"})
+        marriages = [Marriage(people[0], people[1], [people[4]]), Marriage(people[2], people[3], [people[4]])]
+        with self.assertRaises(FamilyTreeValidationError) as raised:
+            FamilyTree.FromPeopleAndMarriages(people.values(), marriages)
+        self.assertEqual(raised.exception.report.ByKind()["too_many_parents"][0].people, (4, 0, 1, 2, 3))
+
+    def test_too_many_parents_refuses_to_load_from_json(self):
+        with tempfile.TemporaryDirectory() as directory:
+            people_file = os.path.join(directory, "people.json")
+            marriages_file = os.path.join(directory, "marriages.json")
+            with open(people_file, "w") as file:
+                json.dump({"People": [{"ID": i, "FirstName": f'p{i}', "Gender": "Male" if i % 2 == 0 else "Female"} for i in range(5)]}, file)
+            with open(marriages_file, "w") as file:
+                json.dump({"Marriages": [
+                    {"Person1": 0, "Person2": 1, "Children": [4]},
+                    {"Person1": 2, "Person2": 3, "Children": [4]},
+                ]}, file)
+            with self.assertRaises(FamilyTreeValidationError):
+                FamilyTree(people_file, marriages_file)
+            tree = FamilyTree(people_file, marriages_file, validate=False)
+            self.assertIsNone(tree.validation_report)
+
+    def test_generation_conflict_is_only_a_warning(self):
+        # 2 marries 5, the child of their sister 3.
+        people = _people({0: "Male", 1: "Female", 2: "Male", 3: "Female", 4: "Male", 5: "Female"})
+        marriages = [
+            Marriage(people[0], people[1], [people[2], people[3]]),
+            Marriage(people[4], people[3], [people[5]]),
+            Marriage(people[2], people[5], []),
+        ]
+        tree = FamilyTree.FromPeopleAndMarriages(people.values(), marriages)
+        report = tree.validation_report
+        self.assertTrue(report.ok())
+        # Which links get blamed depends on the walk order, but each involves 5.
+        self.assertTrue(report.warnings)
+        for issue in report.warnings:
+            self.assertEqual(issue.kind, "generation_conflict")
+            self.assertIn(5, issue.people)
+
+    def test_self_marriage(self):
+        people = _people({0: "Male"})
+        report = validate_family_tree(people.values(), [Marriage(people[0], people[0], [])])
+        self.assertEqual([(i.kind, i.people) for i in report.errors], [("self_marriage", (0,))])
+
+    def test_example_data_is_clean(self):
+        tree = FamilyTree("data/example_people.json", "data/example_marriages.json")
+        self.assertTrue(tree.validation_report.ok())
+        self.assertEqual(tree.validation_report.warnings, [])
+
+
+if __name__ == "__main__":
+    unittest.main()